@@ -0,0 +1 @@
+"""Benchmarks for the OData bridge. Run modules with ``python -m benchmarks.<name>``."""
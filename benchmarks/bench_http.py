@@ -0,0 +1,94 @@
+"""Load test of the HTTP routes against a local stub backend.
+
+Usage::
+
+    python -m benchmarks.bench_http --scenario mix --concurrency 32 --duration 20
+    python -m benchmarks.bench_http --latency-ms 20 --slow-ratio 0.02 --slow-ms 500 --set hedge=true
+
+Starts ``benchmarks.stub_odata`` and ``main.py --mode http`` in subprocesses,
+then keeps ``--concurrency`` requests in flight (closed loop) for
+``--duration`` seconds after ``--warmup`` seconds. Prints throughput and
+p50/p95/p99 latency and saves them as JSON, see ``benchmarks.compare``.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Tuple
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from . import harness
+
+
+def _request(operation: str, arguments: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Route path and query parameters for a workload operation."""
+    service = arguments["service"]
+    if operation == "get_entity":
+        return f"/{service}/{arguments['entity']}({arguments['keys']})", {}
+    if operation == "list_entities":
+        return f"/{service}/{arguments['entity']}", {"$top": arguments["top"], "$skip": arguments["skip"]}
+    return f"/services/{service}/metadata", {}
+
+
+async def _drive(
+    base_url: str,
+    operations: Iterator[Tuple[str, Dict[str, Any]]],
+    concurrency: int,
+    warmup: float,
+    duration: float,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while True:
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                return
+            path, params = _request(*next(operations))
+            try:
+                resp = await client.get(path, params=params)
+                status = str(resp.status_code)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            done = time.perf_counter()
+            if sent < measure_from:
+                continue
+            latencies.append(done - sent)
+            statuses[status] += 1
+            if not status.startswith("2"):
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return harness.summarize(latencies, errors, statuses, duration)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    harness.add_arguments(parser)
+    args = parser.parse_args()
+    with harness.Environment(args) as env:
+        port = harness.free_port()
+        env.spawn_bridge("--mode", "http", "--port", str(port), "--no-warmup")
+        base_url = f"http://127.0.0.1:{port}"
+        harness.wait_http(f"{base_url}/services")
+        results = asyncio.run(
+            _drive(base_url, harness.workload(args), args.concurrency, args.warmup, args.duration)
+        )
+    harness.report(f"http/{args.scenario}", results)
+    print(f"  saved to {harness.save('http', args, results, args.json)}")
+
+
+if __name__ == "__main__":
+    main()
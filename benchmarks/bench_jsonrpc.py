@@ -0,0 +1,116 @@
+"""Load test of the stdio JSON-RPC mode against a local stub backend.
+
+Usage::
+
+    python -m benchmarks.bench_jsonrpc --scenario get --concurrency 8 --duration 20
+
+Starts ``benchmarks.stub_odata`` and ``main.py --mode jsonrpc`` in
+subprocesses and sends MCP ``tools/call`` requests over the bridge's stdin,
+keeping ``--concurrency`` of them outstanding (closed loop). Responses are
+matched by ``id``. Prints throughput and p50/p95/p99 latency and saves them
+as JSON, see ``benchmarks.compare``.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Tuple
+import argparse
+import json
+import subprocess
+import threading
+import time
+
+from . import harness
+
+
+def _message(request_id: int, operation: str, arguments: Dict[str, Any]) -> str:
+    params = {"name": operation, "arguments": arguments}
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "method": "tools/call", "params": params}) + "\n"
+
+
+def _status(message: Dict[str, Any]) -> str:
+    if "error" in message:
+        return f"error {message['error'].get('code')}"
+    result = message.get("result")
+    if isinstance(result, dict) and result.get("isError"):
+        return "tool error"
+    return "ok"
+
+
+def _drive(
+    proc: subprocess.Popen,
+    operations: Iterator[Tuple[str, Dict[str, Any]]],
+    concurrency: int,
+    warmup: float,
+    duration: float,
+) -> Dict[str, Any]:
+    slots = threading.Semaphore(concurrency)
+    sent: Dict[int, float] = {}
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def read() -> None:
+        nonlocal errors
+        for line in proc.stdout:
+            done = time.perf_counter()
+            line = line.strip()
+            if not line:
+                continue
+            message = json.loads(line)
+            sent_at = sent.pop(message.get("id"), None)
+            if sent_at is None:
+                continue
+            slots.release()
+            if sent_at < measure_from:
+                continue
+            latencies.append(done - sent_at)
+            status = _status(message)
+            statuses[status] += 1
+            if status != "ok":
+                errors += 1
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    request_id = 0
+    while time.perf_counter() < stop_at:
+        if not slots.acquire(timeout=0.5):
+            continue
+        request_id += 1
+        line = _message(request_id, *next(operations))
+        sent[request_id] = time.perf_counter()
+        proc.stdin.write(line)
+        proc.stdin.flush()
+    # Let the requests still in flight finish; they count if sent in time.
+    drain_until = time.perf_counter() + 30
+    while sent and time.perf_counter() < drain_until and reader.is_alive():
+        time.sleep(0.01)
+    return harness.summarize(latencies, errors + len(sent), statuses, duration)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    harness.add_arguments(parser)
+    args = parser.parse_args()
+    with harness.Environment(args) as env:
+        proc = env.spawn_bridge(
+            "--mode", "jsonrpc", "--no-warmup",
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1,
+        )
+        # Wait until the bridge answers before the clock starts.
+        proc.stdin.write(json.dumps({"jsonrpc": "2.0", "id": 0, "method": "services"}) + "\n")
+        proc.stdin.flush()
+        if not proc.stdout.readline():
+            raise RuntimeError(f"Bridge exited, see {env.workdir}/bridge.log")
+        results = _drive(proc, harness.workload(args), args.concurrency, args.warmup, args.duration)
+        proc.stdin.close()
+    harness.report(f"jsonrpc/{args.scenario}", results)
+    print(f"  saved to {harness.save('jsonrpc', args, results, args.json)}")
+
+
+if __name__ == "__main__":
+    main()
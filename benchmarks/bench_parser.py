@@ -0,0 +1,106 @@
+"""Compare the streaming metadata parser with full-document xmltodict parsing.
+
+Usage::
+
+    python -m benchmarks.bench_parser --entities 2000 --properties 40
+
+The "before" numbers need ``xmltodict`` installed and reproduce the previous
+``parse_metadata`` implementation, which only read the first ``Schema``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from tools.parser import parse_metadata
+
+from .edmx import generate_edmx
+
+
+def _ensure_list(val: Any) -> List[Any]:
+    if not val:
+        return []
+    if isinstance(val, list):
+        return val
+    return [val]
+
+
+def parse_metadata_xmltodict(xml: str) -> Dict[str, Any]:
+    """Previous ``parse_metadata``: build the whole document, then walk it."""
+    import xmltodict
+
+    doc = xmltodict.parse(xml)
+    edm = doc.get("edmx:Edmx", doc)
+    ds = edm.get("edmx:DataServices") or edm.get("DataServices")
+    schema = _ensure_list(ds.get("Schema"))[0]
+    res: Dict[str, Any] = {"entity_types": [], "entity_sets": [], "functions": [], "associations": [], "navigation": []}
+    res["namespace"] = schema.get("@Namespace")
+    for et in _ensure_list(schema.get("EntityType")):
+        keys = [k.get("@Name") for k in _ensure_list(et.get("Key", {}).get("PropertyRef"))]
+        props = [
+            {"name": p.get("@Name"), "type": p.get("@Type"), "nullable": p.get("@Nullable", "true") != "false", "label": p.get("sap:label")}
+            for p in _ensure_list(et.get("Property"))
+        ]
+        nav = [
+            {"name": n.get("@Name"), "relationship": n.get("@Relationship"), "to_role": n.get("@ToRole"), "from_role": n.get("@FromRole")}
+            for n in _ensure_list(et.get("NavigationProperty"))
+        ]
+        res["entity_types"].append({"name": et.get("@Name"), "keys": keys, "properties": props, "navigation": nav})
+    container = schema.get("EntityContainer", {})
+    for es in _ensure_list(container.get("EntitySet")):
+        res["entity_sets"].append({"name": es.get("@Name"), "entity_type": es.get("@EntityType", "").split(".")[-1]})
+    return res
+
+
+def _measure(fn: Callable[[str], Any], xml: str, repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn(xml)
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    result = fn(xml)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": round(best, 4),
+        "peak_mib": round(peak / 2**20, 1),
+        "entity_types": len(result["entity_types"]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=2000)
+    parser.add_argument("--properties", type=int, default=40)
+    parser.add_argument("--schemas", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    xml = generate_edmx(args.entities, args.properties, args.schemas)
+    results: Dict[str, Any] = {"document_mib": round(len(xml.encode()) / 2**20, 1)}
+    print(f"EDMX size: {results['document_mib']} MiB")
+    candidates = {"streaming": parse_metadata, "xmltodict": parse_metadata_xmltodict}
+    for name, fn in candidates.items():
+        try:
+            results[name] = _measure(fn, xml, args.repeat)
+        except ImportError as exc:
+            print(f"{name:>10}: skipped ({exc})")
+            continue
+        r = results[name]
+        print(f"{name:>10}: {r['seconds']:.3f}s  peak {r['peak_mib']} MiB  {r['entity_types']} entity types")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
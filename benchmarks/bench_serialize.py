@@ -0,0 +1,78 @@
+"""Compare tools/call result encodings: ``str(res)`` vs. compact JSON.
+
+Usage::
+
+    python -m benchmarks.bench_serialize --rows 20000 --columns 20
+
+The payload is an OData V2 ``{"d": {"results": [...]}}`` envelope with
+``__metadata`` and deferred navigation links on every row, like a backend
+list response. ``orjson`` is used when installed.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List
+import argparse
+import gc
+import json
+import time
+
+from tools import serialize
+from tools.serialize import dumps, strip_metadata
+
+
+def generate_envelope(rows: int, columns: int) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    for i in range(rows):
+        row: Dict[str, Any] = {
+            "__metadata": {
+                "id": f"https://host/sap/opu/odata/sap/SRV/Items('{i}')",
+                "uri": f"https://host/sap/opu/odata/sap/SRV/Items('{i}')",
+                "type": "SRV.Item",
+            },
+            "ID": str(i),
+        }
+        for c in range(columns):
+            row[f"Field{c}"] = f"value {i}-{c}" if c % 3 else i * c
+        row["ToOwner"] = {"__deferred": {"uri": f"https://host/sap/opu/odata/sap/SRV/Items('{i}')/ToOwner"}}
+        results.append(row)
+    return {"d": {"results": results}}
+
+
+def _measure(fn: Callable[[Any], str], value: Any, repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        text = fn(value)
+        best = min(best, time.perf_counter() - start)
+    return {"seconds": round(best, 4), "mib": round(len(text.encode("utf-8")) / 2**20, 2)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    value = generate_envelope(args.rows, args.columns)
+    candidates = {
+        "repr": str,
+        "json": lambda v: json.dumps(v),
+        "compact": dumps,
+        "stripped": lambda v: dumps(strip_metadata(v)),
+    }
+    results: Dict[str, Any] = {"rows": args.rows, "orjson": serialize.orjson is not None}
+    print(f"{args.rows} rows x {args.columns} columns, orjson: {results['orjson']}")
+    for name, fn in candidates.items():
+        results[name] = r = _measure(fn, value, args.repeat)
+        print(f"{name:>10}: {r['seconds']:.3f}s  {r['mib']} MiB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare two saved load test results and flag regressions.
+
+Usage::
+
+    python -m benchmarks.compare benchmarks/results/http-mix-abc123.json \\
+        benchmarks/results/http-mix-def456.json --threshold 10
+
+Exits with status 1 if throughput dropped, or p50/p95/p99 latency rose, by
+more than ``--threshold`` percent.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+import argparse
+import json
+import sys
+
+# (label, getter, True if higher is better)
+_METRICS: List[Tuple[str, Any, bool]] = [
+    ("throughput_rps", lambda r: r["throughput_rps"], True),
+    ("p50_ms", lambda r: r["latency_ms"]["p50"], False),
+    ("p95_ms", lambda r: r["latency_ms"]["p95"], False),
+    ("p99_ms", lambda r: r["latency_ms"]["p99"], False),
+    ("errors", lambda r: r["errors"], False),
+]
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _changed_params(base: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    keys = sorted(set(base) | set(new))
+    return [f"{k}: {base.get(k)!r} -> {new.get(k)!r}" for k in keys if base.get(k) != new.get(k)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed change in percent")
+    args = parser.parse_args()
+
+    base, new = _load(args.base), _load(args.new)
+    print(f"{base['benchmark']} {base['revision']}{'+' if base['dirty'] else ''} -> "
+          f"{new['benchmark']} {new['revision']}{'+' if new['dirty'] else ''}")
+    for line in _changed_params(base["params"], new["params"]):
+        print(f"  warning: parameter changed, {line}")
+    regressions = 0
+    for label, get, higher_is_better in _METRICS:
+        old_value, new_value = get(base["results"]), get(new["results"])
+        change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if label == "errors":
+            if new_value > old_value:
+                flag = "  REGRESSION"
+        elif worse > args.threshold:
+            flag = "  REGRESSION"
+        if flag:
+            regressions += 1
+        print(f"  {label:>15}: {old_value:>10} -> {new_value:>10}  ({change:+.1f}%){flag}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Generate synthetic OData V2 ``$metadata`` documents for benchmarks."""
+
+from __future__ import annotations
+
+from typing import List
+
+_TYPES = ["Edm.String", "Edm.Int32", "Edm.Decimal", "Edm.DateTime", "Edm.Boolean"]
+
+
+def generate_edmx(entities: int = 1000, properties: int = 40, schemas: int = 1) -> str:
+    """Return an EDMX document with ``entities`` entity types and sets.
+
+    Entity types are spread over ``schemas`` schemas; the entity container
+    lives in the last one, as in SAP services that split type definitions.
+    """
+    parts: List[str] = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<edmx:Edmx Version="1.0" xmlns:edmx="http://schemas.microsoft.com/ado/2007/06/edmx"'
+        ' xmlns:m="http://schemas.microsoft.com/ado/2007/08/dataservices/metadata"'
+        ' xmlns:sap="http://www.sap.com/Protocols/SAPData">',
+        '<edmx:DataServices m:DataServiceVersion="2.0">',
+    ]
+    per_schema = max(1, -(-entities // schemas))
+    for s in range(schemas):
+        parts.append(f'<Schema Namespace="BENCH_{s}_SRV" xmlns="http://schemas.microsoft.com/ado/2008/09/edm">')
+        for e in range(s * per_schema, min(entities, (s + 1) * per_schema)):
+            parts.append(f'<EntityType Name="Entity{e}" sap:content-version="1"><Key><PropertyRef Name="Id"/></Key>')
+            parts.append('<Property Name="Id" Type="Edm.String" Nullable="false" MaxLength="10" sap:label="Id"/>')
+            for p in range(properties - 1):
+                edm = _TYPES[p % len(_TYPES)]
+                parts.append(f'<Property Name="Field{p}" Type="{edm}" sap:label="Field {p} of entity {e}" sap:filterable="false"/>')
+            parts.append(f'<NavigationProperty Name="ToNext" Relationship="BENCH_SRV.Assoc{e}" FromRole="From" ToRole="To"/>')
+            parts.append("</EntityType>")
+            parts.append(f'<Association Name="Assoc{e}"><End Type="BENCH_SRV.Entity{e}" Multiplicity="1" Role="From"/></Association>')
+        if s == schemas - 1:
+            parts.append('<EntityContainer Name="BENCH_SRV_Entities" m:IsDefaultEntityContainer="true">')
+            for e in range(entities):
+                parts.append(f'<EntitySet Name="Entity{e}Set" EntityType="BENCH_SRV.Entity{e}"/>')
+            parts.append('<FunctionImport Name="Ping" m:HttpMethod="POST"><Parameter Name="Value" Type="Edm.String"/></FunctionImport>')
+            parts.append("</EntityContainer>")
+        parts.append("</Schema>")
+    parts.append("</edmx:DataServices></edmx:Edmx>")
+    return "\n".join(parts)
@@ -0,0 +1,224 @@
+"""Shared pieces of the load drivers: processes, workload and results."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import yaml
+
+from .stub_odata import add_arguments as add_stub_arguments, stub_options
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SCENARIOS = ("get", "list", "metadata", "mix")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_http(url: str, timeout: float = 30.0) -> None:
+    """Poll ``url`` until it answers 200."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as resp:
+                if resp.status == 200:
+                    return
+        except OSError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{url} did not come up within {timeout:.0f}s")
+        time.sleep(0.1)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options shared by the load drivers."""
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mix")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests kept in flight")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before")
+    parser.add_argument("--sets", type=int, default=5, help="Entity sets the requests spread over")
+    parser.add_argument("--top", type=int, default=50, help="$top of list requests")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+        help="Bridge config.yaml setting, e.g. --set cache_ttl=30 (repeatable)",
+    )
+    parser.add_argument("--json", help="Results file (default: benchmarks/results/<name>-<scenario>-<rev>.json)")
+    add_stub_arguments(parser)
+
+
+class Environment:
+    """A stub backend and a bridge config in a temporary directory.
+
+    The bridge reads ``config.yaml`` from its working directory, so it is
+    started with ``cwd`` set to :attr:`workdir`.
+    """
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="odata-bench-")
+        self.stub_port = free_port()
+        self.processes: List[subprocess.Popen] = []
+
+    def __enter__(self) -> "Environment":
+        args = self.args
+        self.spawn([sys.executable, "-m", "benchmarks.stub_odata", "--port", str(self.stub_port), *stub_options(args)])
+        base_url = f"http://127.0.0.1:{self.stub_port}"
+        wait_http(f"{base_url}/{args.service}/$metadata")
+        metadata_dir = os.path.join(self.workdir, "metadata")
+        os.makedirs(metadata_dir)
+        with urllib.request.urlopen(f"{base_url}/{args.service}/$metadata") as resp:
+            xml = resp.read()
+        with open(os.path.join(metadata_dir, f"{args.service}.xml"), "wb") as fh:
+            fh.write(xml)
+        config: Dict[str, Any] = {
+            "dir": metadata_dir,
+            "base_url": base_url,
+            "log_level": "WARNING",
+            "log_file": os.path.join(self.workdir, "bridge.log"),
+        }
+        for item in args.overrides:
+            key, _, value = item.partition("=")
+            config[key.strip()] = yaml.safe_load(value)
+        with open(os.path.join(self.workdir, "config.yaml"), "w", encoding="utf-8") as fh:
+            yaml.safe_dump(config, fh)
+        return self
+
+    def spawn(self, command: Sequence[str], **kwargs: Any) -> subprocess.Popen:
+        kwargs.setdefault("stdout", subprocess.DEVNULL)
+        kwargs.setdefault("stderr", subprocess.DEVNULL)
+        cwd = kwargs.pop("cwd", ROOT)
+        proc = subprocess.Popen(list(command), cwd=cwd, **kwargs)
+        self.processes.append(proc)
+        return proc
+
+    def spawn_bridge(self, *options: str, **kwargs: Any) -> subprocess.Popen:
+        return self.spawn([sys.executable, os.path.join(ROOT, "main.py"), *options], cwd=self.workdir, **kwargs)
+
+    def __exit__(self, *exc: Any) -> None:
+        for proc in reversed(self.processes):
+            if proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+
+def workload(args: argparse.Namespace) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Endless, seeded stream of ``(operation, arguments)`` for a scenario.
+
+    Operations are ``get_entity``, ``list_entities`` and ``metadata``; ``mix``
+    draws 70/25/5 percent of them.
+    """
+    rng = random.Random(args.seed)
+    sets = [f"Entity{i}Set" for i in range(min(args.sets, args.entities))]
+    while True:
+        if args.scenario == "mix":
+            draw = rng.random()
+            operation = "get_entity" if draw < 0.70 else "list_entities" if draw < 0.95 else "metadata"
+        else:
+            operation = {"get": "get_entity", "list": "list_entities", "metadata": "metadata"}[args.scenario]
+        entity = rng.choice(sets)
+        if operation == "get_entity":
+            yield operation, {"service": args.service, "entity": entity, "keys": str(rng.randrange(args.rows))}
+        elif operation == "list_entities":
+            skip = rng.randrange(max(1, args.rows - args.top))
+            yield operation, {"service": args.service, "entity": entity, "top": args.top, "skip": skip}
+        else:
+            yield operation, {"service": args.service}
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(len(ordered) * q / 100) - 1)]
+
+
+def summarize(latencies: List[float], errors: int, statuses: Dict[str, int], seconds: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+
+    def ms(value: float) -> float:
+        return round(value * 1000, 3)
+
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(ordered) / seconds, 1) if seconds else 0.0,
+        "latency_ms": {
+            "mean": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+            "p50": ms(percentile(ordered, 50)),
+            "p95": ms(percentile(ordered, 95)),
+            "p99": ms(percentile(ordered, 99)),
+            "max": ms(ordered[-1]) if ordered else 0.0,
+        },
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def revision() -> Tuple[str, bool]:
+    """Current git commit (short) and whether the tree has local changes."""
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return rev, dirty
+
+
+def save(name: str, args: argparse.Namespace, results: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Write results with the parameters and revision they belong to."""
+    rev, dirty = revision()
+    params = {k: v for k, v in vars(args).items() if k != "json"}
+    document = {
+        "benchmark": name,
+        "revision": rev,
+        "dirty": dirty,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": params,
+        "results": results,
+    }
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        suffix = "-dirty" if dirty else ""
+        path = os.path.join(RESULTS_DIR, f"{name}-{args.scenario}-{rev}{suffix}.json")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(document, fh, indent=2)
+    return path
+
+
+def report(name: str, results: Dict[str, Any]) -> None:
+    lat = results["latency_ms"]
+    print(
+        f"{name}: {results['requests']} requests in {results['seconds']}s, "
+        f"{results['throughput_rps']} req/s, {results['errors']} errors"
+    )
+    print(
+        f"  latency ms  mean {lat['mean']}  p50 {lat['p50']}  p95 {lat['p95']}  "
+        f"p99 {lat['p99']}  max {lat['max']}"
+    )
+    print(f"  statuses {results['statuses']}")
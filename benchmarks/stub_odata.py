@@ -0,0 +1,231 @@
+"""Local OData V2 backend with synthetic data, for load tests.
+
+Usage::
+
+    python -m benchmarks.stub_odata --port 18500 --latency-ms 20 --rows 5000
+
+Serves ``/<service>/$metadata`` (from :func:`benchmarks.edmx.generate_edmx`),
+paged entity sets with ``$top``/``$skip``/``$inlinecount`` and ``__next``
+links, single entities by key, ``/$count`` and function imports (POST,
+echoed). ``$filter``, ``$select`` and ``$orderby`` are accepted and ignored.
+Every response waits ``--latency-ms`` (plus up to ``--jitter-ms``); a
+``--slow-ratio`` share of them waits ``--slow-ms`` instead, to model a tail.
+"""
+
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+import argparse
+import json
+import random
+import re
+import threading
+import time
+
+from .edmx import _TYPES, generate_edmx
+
+_KEY = re.compile(r"^(\w+)\((?:Id=)?'?([^')]*)'?\)$")
+
+
+class StubBackend:
+    """Data and timing behaviour shared by all request handler threads."""
+
+    def __init__(
+        self,
+        service: str = "BENCH",
+        entities: int = 20,
+        properties: int = 12,
+        rows: int = 1000,
+        page_size: int = 100,
+        value_bytes: int = 16,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        slow_ratio: float = 0.0,
+        slow_ms: float = 0.0,
+    ) -> None:
+        self.service = service
+        self.entities = entities
+        self.properties = properties
+        self.rows = rows
+        self.page_size = page_size
+        self.value_bytes = value_bytes
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_ratio = slow_ratio
+        self.slow_ms = slow_ms
+        self.metadata = generate_edmx(entities, properties).encode("utf-8")
+        self.requests = 0
+        self._rows: Dict[str, List[bytes]] = {}
+        self._lock = threading.Lock()
+
+    def delay(self) -> None:
+        if self.slow_ratio and random.random() < self.slow_ratio:
+            time.sleep(self.slow_ms / 1000)
+            return
+        ms = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def _row(self, entity_set: str, index: int) -> Dict[str, Any]:
+        key = str(index)
+        uri = f"http://stub/{self.service}/{entity_set}('{key}')"
+        row: Dict[str, Any] = {
+            "__metadata": {"id": uri, "uri": uri, "type": f"BENCH_SRV.{entity_set[:-3]}"},
+            "Id": key,
+        }
+        text = ("v" * self.value_bytes)[: self.value_bytes]
+        for p in range(self.properties - 1):
+            edm = _TYPES[p % len(_TYPES)]
+            if edm == "Edm.String":
+                value: Any = text
+            elif edm == "Edm.Int32":
+                value = index * (p + 1)
+            elif edm == "Edm.Decimal":
+                value = f"{index}.{p:02d}"
+            elif edm == "Edm.DateTime":
+                value = f"/Date({1700000000000 + index * 1000})/"
+            else:
+                value = index % 2 == 0
+            row[f"Field{p}"] = value
+        row["ToNext"] = {"__deferred": {"uri": f"{uri}/ToNext"}}
+        return row
+
+    def rows_of(self, entity_set: str) -> Optional[List[bytes]]:
+        """Encoded rows of ``entity_set``, built on first use."""
+        rows = self._rows.get(entity_set)
+        if rows is None:
+            match = re.fullmatch(r"Entity(\d+)Set", entity_set)
+            if match is None or int(match.group(1)) >= self.entities:
+                return None
+            with self._lock:
+                rows = self._rows.get(entity_set)
+                if rows is None:
+                    rows = [json.dumps(self._row(entity_set, i)).encode("utf-8") for i in range(self.rows)]
+                    self._rows[entity_set] = rows
+        return rows
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle's
+    # algorithm and delayed ACKs add ~40 ms to every keep-alive response.
+    disable_nagle_algorithm = True
+    backend: StubBackend
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self) -> None:
+        self._send(404, b'{"error":{"message":{"value":"Resource not found"}}}')
+
+    def do_GET(self) -> None:
+        backend = self.backend
+        backend.requests += 1
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = unquote(url.path).strip("/").split("/")
+        if len(parts) < 2 or parts[0] != backend.service:
+            return self._not_found()
+        backend.delay()
+        resource = parts[1]
+        if resource == "$metadata":
+            return self._send(200, backend.metadata, "application/xml")
+        match = _KEY.match(resource)
+        if match:
+            rows = backend.rows_of(match.group(1))
+            index = int(match.group(2)) if match.group(2).isdigit() else -1
+            if rows is None or not 0 <= index < len(rows):
+                return self._not_found()
+            return self._send(200, b'{"d":' + rows[index] + b"}")
+        rows = backend.rows_of(resource)
+        if rows is None:
+            return self._not_found()
+        if parts[2:] == ["$count"]:
+            return self._send(200, str(len(rows)).encode(), "text/plain")
+        skip = int(query.get("$skip", 0))
+        top = int(query.get("$top", len(rows)))
+        end = min(len(rows), skip + top, skip + backend.page_size)
+        body = b'{"d":{"results":[' + b",".join(rows[skip:end]) + b"]"
+        if query.get("$inlinecount") == "allpages":
+            body += b',"__count":"' + str(len(rows)).encode() + b'"'
+        if end < min(len(rows), skip + top):
+            remaining = skip + top - end
+            link = f"http://{self.headers.get('Host')}/{backend.service}/{resource}?$skip={end}&$top={remaining}"
+            body += b',"__next":' + json.dumps(link).encode()
+        self._send(200, body + b"}}")
+
+    def do_POST(self) -> None:
+        self.backend.requests += 1
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.backend.delay()
+        self._send(200, b'{"d":{"echo":' + json.dumps(body.decode("utf-8", "replace")).encode() + b"}}")
+
+
+def make_server(host: str, port: int, backend: StubBackend) -> ThreadingHTTPServer:
+    handler = type("Handler", (_Handler,), {"backend": backend})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Stub options, shared with the load drivers that start a stub."""
+    parser.add_argument("--service", default="BENCH")
+    parser.add_argument("--entities", type=int, default=20, help="Entity sets in $metadata")
+    parser.add_argument("--properties", type=int, default=12, help="Properties per entity type")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per entity set")
+    parser.add_argument("--page-size", type=int, default=100, help="Server-driven page size")
+    parser.add_argument("--value-bytes", type=int, default=16, help="Length of string values")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--slow-ratio", type=float, default=0.0, help="Share of responses that take --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+
+
+def stub_options(args: argparse.Namespace) -> List[str]:
+    """Command line that starts a stub with the options in ``args``."""
+    return [
+        "--service", args.service,
+        "--entities", str(args.entities),
+        "--properties", str(args.properties),
+        "--rows", str(args.rows),
+        "--page-size", str(args.page_size),
+        "--value-bytes", str(args.value_bytes),
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--slow-ratio", str(args.slow_ratio),
+        "--slow-ms", str(args.slow_ms),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18500)
+    add_arguments(parser)
+    args = parser.parse_args()
+    backend = StubBackend(
+        args.service, args.entities, args.properties, args.rows, args.page_size,
+        args.value_bytes, args.latency_ms, args.jitter_ms, args.slow_ratio, args.slow_ms,
+    )
+    server = make_server(args.host, args.port, backend)
+    print(f"Stub OData service {args.service} on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+from typing import Any, Dict, Optional
 import yaml
 
 class Settings:
@@ -17,5 +18,107 @@ class Settings:
         self.user = cfg.get("odata_user")
         self.password = cfg.get("odata_pass")
         self.base_url = cfg.get("base_url")
+        # connection pool used by the async invoker, one per backend base_url
+        self.pool_max_connections = int(cfg.get("pool_max_connections", 100))
+        self.pool_max_keepalive = int(cfg.get("pool_max_keepalive", 20))
+        self.pool_keepalive_expiry = float(cfg.get("pool_keepalive_expiry", 30))
+        # response cache for read-only GETs; a TTL of 0 disables caching
+        self.cache_max_bytes = int(cfg.get("cache_max_bytes", 64 * 1024 * 1024))
+        self.cache_ttl = float(cfg.get("cache_ttl", 0))
+        self.cache_ttls: Dict[str, Any] = cfg.get("cache_ttls") or {}
+        # directory for compiled metadata reused across restarts; unset disables it
+        self.metadata_cache_dir = cfg.get("metadata_cache_dir")
+        # built ServiceContexts kept in memory (estimated size) and how long
+        # unknown service names are remembered (and how many of them at most)
+        self.context_cache_max_bytes = int(cfg.get("context_cache_max_bytes", 512 * 1024 * 1024))
+        self.negative_cache_ttl = float(cfg.get("negative_cache_ttl", 30))
+        self.max_negative_entries = int(cfg.get("max_negative_entries", 10000))
+        # build ServiceContexts at startup; listed services go first
+        self.warmup = bool(cfg.get("warmup", False))
+        self.warmup_services = list(cfg.get("warmup_services") or [])
+        self.warmup_only_listed = bool(cfg.get("warmup_only_listed", False))
+        self.warmup_workers = int(cfg.get("warmup_workers", 0))
+        # stream uncached backend bodies to HTTP clients without decoding them
+        self.passthrough = bool(cfg.get("passthrough", False))
+        # limits for list_entities with all_pages; 0 means unlimited
+        self.paging_max_rows = int(cfg.get("paging_max_rows", 100000))
+        self.paging_max_bytes = int(cfg.get("paging_max_bytes", 256 * 1024 * 1024))
+        # list_entities with parallel: concurrent windows and rows per window
+        self.fanout_parallelism = int(cfg.get("fanout_parallelism", 4))
+        self.fanout_window = int(cfg.get("fanout_window", 5000))
+        # requests per backend $batch call; larger batches are split
+        self.batch_max_operations = int(cfg.get("batch_max_operations", 50))
+        # worker threads handling JSON-RPC requests concurrently
+        self.jsonrpc_workers = int(cfg.get("jsonrpc_workers", 8))
+        # logging: level, payload size in log lines, share of payload lines kept
+        self.log_level = str(cfg.get("log_level", "INFO")).upper()
+        self.log_file = cfg.get("log_file")
+        self.log_payload_chars = int(cfg.get("log_payload_chars", 1000))
+        self.log_sample_rate = float(cfg.get("log_sample_rate", 1.0))
+        self.log_queue_size = int(cfg.get("log_queue_size", 10000))
+        # drop OData __metadata/__deferred from tools/call results
+        self.strip_metadata = bool(cfg.get("strip_metadata", True))
+        # $select applied when a request has none, per service and entity set
+        self.default_select: Dict[str, Any] = cfg.get("default_select") or {}
+        # SQLite store: prepared statements kept per connection, and how long
+        # the list of service names is reused before checking for changes
+        self.db_cached_statements = int(cfg.get("db_cached_statements", 64))
+        self.db_index_ttl = float(cfg.get("db_index_ttl", 5))
+        # seconds between checks for changed metadata; 0 disables reloading
+        self.watch_interval = float(cfg.get("watch_interval", 0))
+        # adaptive concurrency limit per backend base_url (AIMD on latency) and
+        # circuit breaker: open after breaker_failures overload errors in a row
+        self.limiter = bool(cfg.get("limiter", False))
+        self.limiter_initial = int(cfg.get("limiter_initial", 20))
+        self.limiter_min = int(cfg.get("limiter_min", 1))
+        self.limiter_max = int(cfg.get("limiter_max", self.pool_max_connections))
+        self.limiter_latency_tolerance = float(cfg.get("limiter_latency_tolerance", 2.0))
+        self.breaker_failures = int(cfg.get("breaker_failures", 5))
+        self.breaker_cooldown = float(cfg.get("breaker_cooldown", 30))
+        # backend timeouts in seconds (0 waits forever); idempotent calls are
+        # retried on connection errors and 429/5xx with jittered backoff
+        self.connect_timeout = float(cfg.get("connect_timeout", 5))
+        self.read_timeout = float(cfg.get("read_timeout", 60))
+        self.retries = int(cfg.get("retries", 2))
+        self.retry_backoff = float(cfg.get("retry_backoff", 0.1))
+        self.retry_backoff_max = float(cfg.get("retry_backoff_max", 2))
+        # send a second GET when the first is slower than the backend's p95
+        self.hedge = bool(cfg.get("hedge", False))
+        self.hedge_min_samples = int(cfg.get("hedge_min_samples", 20))
+        self.hedge_min_delay = float(cfg.get("hedge_min_delay", 0.01))
+        # latency histograms and counters for /metrics and the metrics method
+        self.metrics = bool(cfg.get("metrics", True))
+        # Server-Timing headers and JSON-RPC result _meta with stage durations
+        self.server_timing = bool(cfg.get("server_timing", False))
+        # token for /admin endpoints (X-Admin-Token header); empty disables them
+        self.admin_token = str(cfg.get("admin_token", "") or "")
+        self.profile_max_seconds = float(cfg.get("profile_max_seconds", 60))
+        # share one backend call between identical concurrent GETs
+        self.coalesce = bool(cfg.get("coalesce", True))
+        self.coalesce_timeout = float(cfg.get("coalesce_timeout", 60))
+
+    def cache_ttl_for(self, service: str, entity_set: Optional[str] = None) -> float:
+        """Return the response cache TTL in seconds for an entity set.
+
+        ``cache_ttls`` maps a service either to a number of seconds or to a
+        mapping of entity set names (plus an optional ``default``) to seconds.
+        """
+        rule = self.cache_ttls.get(service)
+        if rule is None:
+            return self.cache_ttl
+        if not isinstance(rule, dict):
+            return float(rule)
+        return float(rule.get(entity_set, rule.get("default", self.cache_ttl)))
+
+    def default_select_for(self, service: str, entity_set: str) -> Optional[str]:
+        """Return the default ``$select`` for an entity set, if configured.
+
+        ``default_select`` maps services to entity sets, each with a list of
+        property names or a comma separated string.
+        """
+        rule = (self.default_select.get(service) or {}).get(entity_set)
+        if not rule:
+            return None
+        return rule if isinstance(rule, str) else ",".join(rule)
 
 settings = Settings()
@@ -1,16 +1,32 @@
 """Simple JSON-RPC 2.0 server exposing OData endpoints."""
 import sys
 import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Callable, Dict, List, Any, Set
 from jsonrpcserver import method, dispatch, result
 from starlette.responses import Response
 import json
 
+from config import settings
+from tools.batch import BatchResponseError
+from tools.limiter import BackendUnavailable
+from tools import timing
+from tools.log import payload, payload_logger, setup_logging
+from tools.metrics import IN_FLIGHT, REGISTRY, observe_stage, stage_timer
+from tools.serialize import dumps, dumps_result
+
 # Capabilities advertised during the JSON-RPC ``initialize`` handshake.
 # ``tools`` is currently the only capability required by the Claude agent.
 CAPABILITIES = {"tools": {}}
 
+logger = logging.getLogger(__name__)
+payload_log = payload_logger(__name__)
+LOG_FILE = Path(__file__).with_name("jsonrpc.log")
+
 from openapi_server import app
 from openapi_server.routes.odata import (
     services as _services,
@@ -19,6 +35,7 @@ from openapi_server.routes.odata import (
     list_entities as _list_entities,
     invoke as _invoke,
     call_function as _call_function,
+    batch as _batch,
 )
 
 
@@ -26,10 +43,12 @@ def _as_raw(value: Any) -> Any:
     """Return the content from a FastAPI Response or passthrough."""
     if isinstance(value, Response):
         text = value.body.decode()
-        try:
-            return json.loads(text)
-        except Exception:
-            return text
+        if value.media_type == "application/json":
+            try:
+                return json.loads(text)
+            except ValueError:
+                pass
+        return text
     return value
 
 # Descriptions and parameter schemas for supported JSON-RPC tools
@@ -44,7 +63,14 @@ TOOLS: List[Dict[str, Dict]] = [
         "description": "Get the metadata XML for a given service",
         "inputSchema": {
             "type": "object",
-            "properties": {"service": {"type": "string"}},
+            "properties": {
+                "service": {"type": "string"},
+                "format": {
+                    "type": "string",
+                    "enum": ["xml", "json"],
+                    "description": "json returns a compact summary of entity sets, keys and property types",
+                },
+            },
             "required": ["service"],
         },
     },
@@ -58,6 +84,10 @@ TOOLS: List[Dict[str, Dict]] = [
                 "entity": {"type": "string"},
                 "keys": {"type": "string"},
                 "expand": {"type": "string"},
+                "select": {
+                    "type": "string",
+                    "description": "Comma separated properties to return; * for all",
+                },
             },
             "required": ["service", "entity", "keys"],
         },
@@ -76,6 +106,18 @@ TOOLS: List[Dict[str, Dict]] = [
                 "orderby": {"type": "string"},
                 "expand": {"type": "string"},
                 "count": {"type": "boolean"},
+                "select": {
+                    "type": "string",
+                    "description": "Comma separated properties to return; * for all",
+                },
+                "all_pages": {
+                    "type": "boolean",
+                    "description": "Follow server-side paging and return all rows as NDJSON",
+                },
+                "parallel": {
+                    "type": "boolean",
+                    "description": "Read the whole set in concurrent $skip/$top windows, returned as NDJSON",
+                },
             },
             "required": ["service", "entity"],
         },
@@ -107,9 +149,43 @@ TOOLS: List[Dict[str, Dict]] = [
             "required": ["service", "name", "body"],
         },
     },
+    {
+        "name": "batch",
+        "description": (
+            "Run many reads (and optional changesets of writes) against one "
+            "service in a single OData $batch round trip"
+        ),
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "service": {"type": "string"},
+                "operations": {
+                    "type": "array",
+                    "description": (
+                        'Items are {"method": "GET", "path": "/Set(key)", "params": {}} '
+                        'or {"changeset": [{"method": "POST", "path": "/Set", "json": {}}]}'
+                    ),
+                    "items": {"type": "object"},
+                },
+            },
+            "required": ["service", "operations"],
+        },
+    },
 ]
 
 
+def _error(exc: Exception) -> result.Result:
+    """Map a failed call to an error result.
+
+    Shed backend calls get 503 and unreadable backend ``$batch`` answers 502.
+    """
+    if isinstance(exc, BackendUnavailable):
+        return result.Error(code=503, message=str(exc), data={"retry_after": exc.retry_after})
+    if isinstance(exc, BatchResponseError):
+        return result.Error(code=502, message=str(exc), data={"status": exc.status, "content_type": exc.content_type})
+    return result.Error(code=500, message=str(exc))
+
+
 @method
 def initialize(
     protocolVersion: Optional[str] = None,
@@ -129,60 +205,63 @@ def initialize(
     # standard version supported by this server.
     _ = (protocolVersion, capabilities, clientInfo, _kwargs)
 
-    print(
-        f"DEBUG: initialize called with protocolVersion={protocolVersion}, capabilities={capabilities}, clientInfo={clientInfo}",
-        file=sys.stderr,
-    )
+    payload_log.debug("initialize protocolVersion=%s clientInfo=%s", protocolVersion, clientInfo)
     try:
         res = {
             "protocolVersion": "2024-11-05",
             "serverInfo": {"name": app.title, "version": app.version},
             "capabilities": CAPABILITIES,
         }
-        print(f"DEBUG: Got result: {res}", file=sys.stderr)
+        payload_log.debug("Result: %s", payload(res))
         return result.Success(res)
     except Exception as e:
-        print(f"DEBUG: Error occurred: {e}", file=sys.stderr)
-        return result.Error(code=500, message=str(e))
+        logger.warning("initialize failed: %s", e)
+        return _error(e)
 
 
 @method
 def services() -> result.Result:
-    print("DEBUG: services called", file=sys.stderr)
+    payload_log.debug("services")
     try:
         res = _as_raw(_services())
-        print(f"DEBUG: Got result: {res}", file=sys.stderr)
+        payload_log.debug("Result: %s", payload(res))
         return result.Success(res)
     except Exception as e:
-        print(f"DEBUG: Error occurred: {e}", file=sys.stderr)
-        return result.Error(code=500, message=str(e))
+        logger.warning("services failed: %s", e)
+        return _error(e)
 
 
 @method
-def metadata(service: str) -> result.Result:
-    print(f"DEBUG: metadata called with service={service}", file=sys.stderr)
+def metadata(service: str, format: str = "xml") -> result.Result:
+    payload_log.debug("metadata service=%s format=%s", service, format)
     try:
-        res = _as_raw(_metadata(service))
-        print(f"DEBUG: Got result: {res}", file=sys.stderr)
+        res = _as_raw(_metadata(service, format))
+        payload_log.debug("Result: %s", payload(res))
         return result.Success(res)
     except Exception as e:
-        print(f"DEBUG: Error occurred: {e}", file=sys.stderr)
-        return result.Error(code=500, message=str(e))
+        logger.warning("metadata failed: %s", e)
+        return _error(e)
 
 
 @method
-def get_entity(service: str, entity: str, keys: str, expand: Optional[str] = None) -> result.Result:
-    print(
-        f"DEBUG: get_entity called with service={service}, entity={entity}, keys={keys}, expand={expand}",
-        file=sys.stderr,
+def get_entity(
+    service: str,
+    entity: str,
+    keys: str,
+    expand: Optional[str] = None,
+    select: Optional[str] = None,
+) -> result.Result:
+    payload_log.debug(
+        "get_entity service=%s entity=%s keys=%s expand=%s select=%s",
+        service, entity, keys, expand, select,
     )
     try:
-        res = _as_raw(_get_entity(service, entity, keys, expand))
-        print(f"DEBUG: Got result: {res}", file=sys.stderr)
+        res = _as_raw(_get_entity(service, entity, keys, expand, select))
+        payload_log.debug("Result: %s", payload(res))
         return result.Success(res)
     except Exception as e:
-        print(f"DEBUG: Error occurred: {e}", file=sys.stderr)
-        return result.Error(code=500, message=str(e))
+        logger.warning("get_entity failed: %s", e)
+        return _error(e)
 
 
 @method
@@ -195,70 +274,80 @@ def list_entities(
     orderby: Optional[str] = None,
     expand: Optional[str] = None,
     count: Optional[bool] = None,
+    all_pages: Optional[bool] = None,
+    parallel: Optional[bool] = None,
+    select: Optional[str] = None,
 ) -> result.Result:
-    print(
-        "DEBUG: list_entities called with "
-        f"service={service}, entity={entity}, filter_={filter_}, top={top}, "
-        f"skip={skip}, orderby={orderby}, expand={expand}, count={count}",
-        file=sys.stderr,
+    payload_log.debug(
+        "list_entities service=%s entity=%s filter=%s top=%s skip=%s orderby=%s "
+        "expand=%s count=%s all_pages=%s parallel=%s select=%s",
+        service, entity, filter_, top, skip, orderby, expand, count, all_pages,
+        parallel, select,
     )
     try:
         res = _list_entities(
-            service, entity, filter_, top, skip, orderby, expand, count
+            service, entity, filter_, top, skip, orderby, expand, count,
+            bool(all_pages), bool(parallel), select,
         )
         res = _as_raw(res)
-        print(f"DEBUG: Got result: {res}", file=sys.stderr)
+        payload_log.debug("Result: %s", payload(res))
         return result.Success(res)
     except Exception as e:
-        print(f"DEBUG: Error occurred: {e}", file=sys.stderr)
-        return result.Error(code=500, message=str(e))
+        logger.warning("list_entities failed: %s", e)
+        return _error(e)
 
 
 @method
 def invoke(
     service: str, path: str, method: str = "GET", json: Optional[dict] = None
 ) -> result.Result:
-    print(
-        f"DEBUG: invoke called with service={service}, path={path}, method={method}, json={json}",
-        file=sys.stderr,
-    )
+    payload_log.debug("invoke service=%s path=%s method=%s json=%s", service, path, method, payload(json))
     try:
         res = _invoke({"service": service, "path": path, "method": method, "json": json})
         res = _as_raw(res)
-        print(f"DEBUG: Got result: {res}", file=sys.stderr)
+        payload_log.debug("Result: %s", payload(res))
         return result.Success(res)
     except Exception as e:
-        print(f"DEBUG: Error occurred: {e}", file=sys.stderr)
-        return result.Error(code=500, message=str(e))
+        logger.warning("invoke failed: %s", e)
+        return _error(e)
 
 
 @method
 def call_function(service: str, name: str, body: dict) -> result.Result:
-    print(
-        f"DEBUG: call_function called with service={service}, name={name}, body={body}",
-        file=sys.stderr,
-    )
+    payload_log.debug("call_function service=%s name=%s body=%s", service, name, payload(body))
     try:
         res = _call_function(service, name, body)
         res = _as_raw(res)
-        print(f"DEBUG: Got result: {res}", file=sys.stderr)
+        payload_log.debug("Result: %s", payload(res))
         return result.Success(res)
     except Exception as e:
-        print(f"DEBUG: Error occurred: {e}", file=sys.stderr)
-        return result.Error(code=500, message=str(e))
+        logger.warning("call_function failed: %s", e)
+        return _error(e)
+
+
+@method
+def batch(service: str, operations: List[Dict[str, Any]]) -> result.Result:
+    payload_log.debug("batch service=%s operations=%s", service, payload(operations))
+    try:
+        res = _batch({"service": service, "operations": operations})
+        payload_log.debug("Result: %s", payload(res))
+        return result.Success(res)
+    except Exception as e:
+        logger.warning("batch failed: %s", e)
+        return _error(e)
 
 
 @method(name="tools/list")
 def list_tools() -> result.Result:
     """Return metadata about available JSON-RPC tools."""
-    print("DEBUG: list_tools called", file=sys.stderr)
+    payload_log.debug("tools/list")
     try:
         res = {"tools": TOOLS}
-        print(f"DEBUG: Got result: {res}", file=sys.stderr)
+        payload_log.debug("Result: %s", payload(res))
         return result.Success(res)
     except Exception as e:
-        print(f"DEBUG: Error occurred: {e}", file=sys.stderr)
-        return result.Error(code=500, message=str(e))
+        logger.warning("list_tools failed: %s", e)
+        return _error(e)
 
 
 @method(name="tools/call")
@@ -274,13 +363,16 @@ def call_tool(name: str, arguments: Optional[Dict[str, Any]] = None) -> result.R
 
     tool_map = {
         "services": lambda: _as_raw(_services()),
-        "metadata": lambda: _as_raw(_metadata(**arguments)),
+        "metadata": lambda: _as_raw(
+            _metadata(arguments.get("service"), arguments.get("format", "xml"))
+        ),
         "get_entity": lambda: _as_raw(
             _get_entity(
                 arguments.get("service"),
                 arguments.get("entity"),
                 arguments.get("keys"),
                 arguments.get("expand"),
+                arguments.get("select"),
             )
         ),
         "list_entities": lambda: _as_raw(
@@ -293,6 +385,9 @@ def call_tool(name: str, arguments: Optional[Dict[str, Any]] = None) -> result.R
                 arguments.get("orderby"),
                 arguments.get("expand"),
                 arguments.get("count"),
+                bool(arguments.get("all_pages")),
+                bool(arguments.get("parallel")),
+                arguments.get("select"),
             )
         ),
         "invoke": lambda: _as_raw(_invoke(arguments)),
@@ -303,42 +398,172 @@ def call_tool(name: str, arguments: Optional[Dict[str, Any]] = None) -> result.R
                 arguments.get("body", {}),
             )
         ),
+        "batch": lambda: _as_raw(_batch(arguments)),
     }
 
     func = tool_map.get(name)
     if not func:
         return result.Error(code=404, message="Unknown tool")
 
-    print(f"DEBUG: About to call {name} with {arguments}", file=sys.stderr)
+    payload_log.debug("tools/call %s arguments=%s", name, payload(arguments))
     try:
         res = func()
-        print(f"DEBUG: Got result: {res}", file=sys.stderr)
-        return result.Success(
-            {"content": [{"type": "text", "text": str(res)}]}
-        )
+        payload_log.debug("Result: %s", payload(res))
+        with stage_timer("encode", arguments.get("service") or "", arguments.get("entity") or ""):
+            text = dumps_result(res)
+        return result.Success({"content": [{"type": "text", "text": text}]})
     except Exception as e:
-        print(f"DEBUG: Error occurred: {e}", file=sys.stderr)
-        return result.Error(code=500, message=str(e))
+        logger.warning("call_tool failed: %s", e)
+        return _error(e)
+
+
+@method
+def metrics() -> result.Result:
+    """The ``/metrics`` values as a dict, for clients without HTTP access."""
+    return result.Success(REGISTRY.snapshot())
+
+
+def _serialize(response: Any) -> str:
+    """Encode a response, adding stage timings to object results as ``_meta``."""
+    collected = timing.current()
+    if collected is not None and isinstance(response, dict) and isinstance(response.get("result"), dict):
+        res = response["result"]
+        # Copy: the result may be a cached backend response.
+        meta = {**res.get("_meta", {}), "timing_ms": collected.as_dict()}
+        response = {**response, "result": {**res, "_meta": meta}}
+    return dumps(response)
+
+
+def _dispatch(raw: str) -> str:
+    """Dispatch one request, counted as in flight and timed as ``request``."""
+    in_flight = IN_FLIGHT.labels("jsonrpc")
+    in_flight.inc()
+    token = timing.start() if settings.server_timing else None
+    start = time.perf_counter()
+    try:
+        return dispatch(raw, serializer=_serialize)
+    finally:
+        if token is not None:
+            timing.stop(token)
+        in_flight.dec()
+        observe_stage("request", time.perf_counter() - start)
+
+
+# Notifications that cancel an earlier request: MCP and LSP spellings.
+_CANCEL_METHODS = {"notifications/cancelled": "requestId", "$/cancelRequest": "id"}
+
+
+class ConcurrentDispatcher:
+    """Dispatch requests on a worker pool and write responses when ready.
+
+    Responses are written in completion order; clients correlate them by
+    ``id``. Batch arrays are split and their items run in parallel, then
+    answered with a single array. A cancellation notification drops the
+    request if it has not started yet and suppresses its response otherwise.
+    """
+
+    def __init__(self, workers: int, write: Callable[[str], None]) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jsonrpc")
+        self._write = write
+        self._lock = threading.Lock()
+        self._inflight: Dict[Any, Future] = {}
+        self._cancelled: Set[Any] = set()
+
+    def submit(self, line: str) -> None:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            message = None
+        if isinstance(message, list) and message:
+            self._submit_batch(message)
+        else:
+            self._submit_one(message, line, self._write_nonempty)
+
+    def shutdown(self) -> None:
+        """Wait for in-flight requests to finish."""
+        self._pool.shutdown(wait=True)
+
+    def _write_nonempty(self, text: str) -> None:
+        if text:
+            self._write(text)
+
+    def _submit_batch(self, items: List[Any]) -> None:
+        responses: List[str] = [""] * len(items)
+        remaining = [len(items)]
+
+        def collect(index: int, text: str) -> None:
+            with self._lock:
+                responses[index] = text
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished:
+                parts = [r for r in responses if r]
+                if parts:
+                    self._write("[" + ",".join(parts) + "]")
+
+        for index, item in enumerate(items):
+            self._submit_one(item, json.dumps(item), partial(collect, index))
+
+    def _submit_one(self, message: Any, raw: str, done: Callable[[str], None]) -> None:
+        if isinstance(message, dict) and message.get("method") in _CANCEL_METHODS:
+            params = message.get("params") or {}
+            self._cancel(params.get(_CANCEL_METHODS[message["method"]]))
+            done("")
+            return
+        req_id = message.get("id") if isinstance(message, dict) else None
+        future = self._pool.submit(_dispatch, raw)
+        if req_id is not None:
+            with self._lock:
+                self._inflight[req_id] = future
+        future.add_done_callback(lambda f: self._finish(req_id, f, done))
+
+    def _cancel(self, req_id: Any) -> None:
+        with self._lock:
+            future = self._inflight.get(req_id)
+            if future is None:
+                return
+            self._cancelled.add(req_id)
+        # Outside the lock: cancel() runs the done callback synchronously.
+        future.cancel()
+
+    def _finish(self, req_id: Any, future: Future, done: Callable[[str], None]) -> None:
+        with self._lock:
+            if self._inflight.get(req_id) is future:
+                del self._inflight[req_id]
+            dropped = future.cancelled() or req_id in self._cancelled
+            self._cancelled.discard(req_id)
+        if dropped:
+            done("")
+            return
+        try:
+            done(future.result())
+        except Exception as exc:
+            logger.exception("Dispatch failed")
+            done(json.dumps({
+                "jsonrpc": "2.0",
+                "error": {"code": -32603, "message": str(exc)},
+                "id": req_id,
+            }))
 
 
 def serve() -> None:
     """Run the JSON-RPC server reading from stdin and writing to stdout."""
-    log_file = Path(__file__).with_name("jsonrpc.log")
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stderr),
-            logging.FileHandler(log_file, mode="a"),
-        ],
-    )
-    logger = logging.getLogger(__name__)
-    for line in sys.stdin:
-        line = line.strip()
-        if not line:
-            continue
-        logger.info("Request: %s", line)
-        response = dispatch(line)
-        if response:
-            logger.info("Response: %s", response)
-            print(response, flush=True)
+    setup_logging(settings.log_file or LOG_FILE)
+    write_lock = threading.Lock()
+
+    def write(response: str) -> None:
+        payload_log.info("Response: %s", payload(response))
+        with write_lock:
+            sys.stdout.write(response + "\n")
+            sys.stdout.flush()
+
+    dispatcher = ConcurrentDispatcher(settings.jsonrpc_workers, write)
+    try:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            payload_log.info("Request: %s", payload(line))
+            dispatcher.submit(line)
+    finally:
+        dispatcher.shutdown()
@@ -5,7 +5,10 @@ import uvicorn
 
 from config import settings
 from openapi_server import app
-from jsonrpc_server import serve as serve_jsonrpc
+from jsonrpc_server import LOG_FILE as JSONRPC_LOG_FILE, serve as serve_jsonrpc
+from tools.log import setup_logging
+from openapi_server.warmup import start_warmup
+from openapi_server.watcher import start_watcher
 
 
 def main() -> None:
@@ -22,9 +25,20 @@ def main() -> None:
         default=settings.port,
         help="HTTP server port",
     )
+    parser.add_argument(
+        "--warmup",
+        action=argparse.BooleanOptionalAction,
+        default=settings.warmup,
+        help="Build service contexts at startup",
+    )
     args = parser.parse_args()
     mode = args.mode
     port = args.port
+    setup_logging(settings.log_file or (JSONRPC_LOG_FILE if mode != "http" else None))
+    if args.warmup:
+        start_warmup()
+    if settings.watch_interval > 0:
+        start_watcher()
     if mode == "jsonrpc":
         serve_jsonrpc()
     elif mode == "http":
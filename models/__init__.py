@@ -1,5 +1,5 @@
 """Dynamic Pydantic models generated from OData metadata."""
 
-from .dynamic import build_models
+from .dynamic import LazyModels, build_models
 
-__all__ = ["build_models"]
+__all__ = ["LazyModels", "build_models"]
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Set, Type
 from datetime import datetime
+import threading
+import time
 from pydantic import BaseModel, Field, create_model
 
 TYPE_MAP = {
@@ -14,19 +16,19 @@ TYPE_MAP = {
 }
 
 
-def _map_type(edm_type: str, complex_models: Dict[str, Type[BaseModel]]) -> Any:
+def _map_type(edm_type: str, complex_model: Callable[[str], Optional[Type[BaseModel]]]) -> Any:
     if not edm_type:
         return str
     if edm_type in TYPE_MAP:
         return TYPE_MAP[edm_type]
     ct_name = edm_type.split(".")[-1]
-    return complex_models.get(ct_name, str)
+    return complex_model(ct_name) or str
 
 
-def _build_model(name: str, props: List[Dict[str, Any]], complex_models: Dict[str, Type[BaseModel]]) -> Type[BaseModel]:
+def _build_model(name: str, props: List[Dict[str, Any]], complex_model: Callable[[str], Optional[Type[BaseModel]]]) -> Type[BaseModel]:
     fields: Dict[str, Any] = {}
     for prop in props:
-        py_type = _map_type(prop.get("type"), complex_models)
+        py_type = _map_type(prop.get("type"), complex_model)
         default = ...
         if prop.get("nullable", True):
             py_type = Optional[py_type]
@@ -35,20 +37,98 @@ def _build_model(name: str, props: List[Dict[str, Any]], complex_models: Dict[st
     return create_model(name, **fields)
 
 
-def build_models(metadata: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
-    complex_models: Dict[str, Type[BaseModel]] = {}
-    for ct in metadata.get("complex_types", []):
-        complex_models[ct["name"]] = _build_model(ct["name"], ct.get("properties", []), complex_models)
+class _ModelBuilder:
+    """Create models on first use, together with the complex types they need."""
 
-    entity_models: Dict[str, Dict[str, Any]] = {}
-    for et in metadata.get("entity_types", []):
-        model = _build_model(et["name"], et.get("properties", []), complex_models)
-        entity_models[et["name"]] = {"model": model, "keys": et.get("keys", [])}
+    def __init__(
+        self, metadata: Dict[str, Any], on_build: Optional[Callable[[str, float], None]] = None
+    ) -> None:
+        self._on_build = on_build
+        self._entity_types = {et["name"]: et for et in metadata.get("entity_types", [])}
+        self._complex_types = {ct["name"]: ct for ct in metadata.get("complex_types", [])}
+        self._complex_models: Dict[str, Type[BaseModel]] = {}
+        self._entity_models: Dict[str, Dict[str, Any]] = {}
+        self._in_progress: Set[str] = set()
+        self._lock = threading.RLock()
 
-    set_models: Dict[str, Dict[str, Any]] = {}
-    for es in metadata.get("entity_sets", []):
-        et_model = entity_models.get(es["entity_type"])
-        if et_model:
-            set_models[es["name"]] = et_model
+    def complex_model(self, name: str) -> Optional[Type[BaseModel]]:
+        model = self._complex_models.get(name)
+        if model is not None:
+            return model
+        ct = self._complex_types.get(name)
+        if ct is None:
+            return None
+        with self._lock:
+            if name in self._complex_models:
+                return self._complex_models[name]
+            if name in self._in_progress:
+                # Self-referencing complex type; fall back to a plain string.
+                return None
+            self._in_progress.add(name)
+            try:
+                model = _build_model(name, ct.get("properties", []), self.complex_model)
+            finally:
+                self._in_progress.discard(name)
+            self._complex_models[name] = model
+            return model
 
-    return {"entities": entity_models, "entity_sets": set_models}
+    def entity(self, name: str) -> Dict[str, Any]:
+        entry = self._entity_models.get(name)
+        if entry is not None:
+            return entry
+        et = self._entity_types[name]
+        with self._lock:
+            entry = self._entity_models.get(name)
+            if entry is None:
+                start = time.perf_counter()
+                model = _build_model(name, et.get("properties", []), self.complex_model)
+                entry = self._entity_models[name] = {"model": model, "keys": et.get("keys", [])}
+                if self._on_build is not None:
+                    self._on_build(name, time.perf_counter() - start)
+            return entry
+
+
+class LazyModels(Mapping[str, Dict[str, Any]]):
+    """Read-only mapping whose ``{"model", "keys"}`` values are built on access.
+
+    Membership tests, iteration and ``len`` only use the names from the
+    metadata and never create a model.
+    """
+
+    def __init__(self, targets: Dict[str, str], build: Callable[[str], Dict[str, Any]]) -> None:
+        self._targets = targets
+        self._build = build
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        return self._build(self._targets[name])
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._targets
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._targets)
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+
+def build_models(
+    metadata: Dict[str, Any], on_build: Optional[Callable[[str, float], None]] = None
+) -> Dict[str, LazyModels]:
+    """Return lazily built entity models keyed by entity type and entity set.
+
+    Models are created with ``create_model`` the first time an entry is read
+    and memoized afterwards. ``on_build(entity_type, seconds)`` is called
+    after each model is created, including the complex types it needed.
+    """
+    builder = _ModelBuilder(metadata, on_build)
+    entity_types = {et["name"]: et["name"] for et in metadata.get("entity_types", [])}
+    set_targets = {
+        es["name"]: es["entity_type"]
+        for es in metadata.get("entity_sets", [])
+        if es["entity_type"] in entity_types
+    }
+    return {
+        "entities": LazyModels(entity_types, builder.entity),
+        "entity_sets": LazyModels(set_targets, builder.entity),
+    }
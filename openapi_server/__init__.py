@@ -1,34 +1,33 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
-from typing import Any, Dict
+from fastapi.responses import JSONResponse
+from typing import Any, AsyncIterator, Dict
+import httpx
+import requests
+from config import settings
+from tools.async_invoker import aclose_clients
+from tools.batch import BatchResponseError
+from tools.limiter import BackendUnavailable
+from .instrumentation import MetricsMiddleware, ServerTimingMiddleware, TimedJSONResponse
 from .routes import router
+from .schema import _convert_to_openapi_30
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Release pooled backend connections when the server stops."""
+    yield
+    await aclose_clients()
 
-def _convert_to_openapi_30(schema: Dict[str, Any]) -> Dict[str, Any]:
-    """Convert OpenAPI 3.1 schema pieces to a 3.0 compatible format."""
-
-    def transform(obj: Any) -> None:
-        if isinstance(obj, dict):
-            if "anyOf" in obj and len(obj["anyOf"]) == 2 and obj["anyOf"][1].get("type") == "null":
-                first = obj["anyOf"][0]
-                obj.pop("anyOf")
-                obj.update(first)
-                obj["nullable"] = True
-            for value in obj.values():
-                transform(value)
-        elif isinstance(obj, list):
-            for item in obj:
-                transform(item)
-
-    schema["openapi"] = "3.0.3"
-    transform(schema)
-    return schema
 
 # Force OpenAPI 3.0.x output for wider compatibility
 app = FastAPI(
     title="MCP OData Bridge",
     version="1.0.0",
     openapi_url="/openapi.json",  # expose schema for docs
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
 )
 app.add_middleware(
     CORSMiddleware,
@@ -36,13 +35,46 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+if settings.server_timing:
+    app.add_middleware(ServerTimingMiddleware)
 app.include_router(router)
 
 
+@app.exception_handler(TimeoutError)
+@app.exception_handler(requests.Timeout)
+@app.exception_handler(httpx.TimeoutException)
+async def timeout_handler(_request: Request, exc: Exception) -> JSONResponse:
+    return JSONResponse(status_code=504, content={"detail": str(exc) or "Backend timeout"})
+
+
+@app.exception_handler(BackendUnavailable)
+async def unavailable_handler(_request: Request, exc: BackendUnavailable) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(BatchResponseError)
+async def bad_gateway_handler(_request: Request, exc: BatchResponseError) -> JSONResponse:
+    return JSONResponse(
+        status_code=502,
+        content={"detail": str(exc), "status": exc.status, "content_type": exc.content_type},
+    )
+
+
 def custom_openapi() -> Dict[str, Any]:
-    """Return an OpenAPI 3.0 compatible schema."""
-    schema = get_openapi(title=app.title, version=app.version, routes=app.routes)
-    return _convert_to_openapi_30(schema)
+    """Return an OpenAPI 3.0 compatible schema, built once.
+
+    Routes are fixed after startup; per-service typed documents are served
+    by ``/services/{service}/openapi.json``.
+    """
+    if app.openapi_schema is None:
+        schema = get_openapi(title=app.title, version=app.version, routes=app.routes)
+        app.openapi_schema = _convert_to_openapi_30(schema)
+    return app.openapi_schema
 
 
 app.openapi = custom_openapi
@@ -0,0 +1,101 @@
+"""Request metrics and Server-Timing headers for the HTTP server."""
+
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+import time
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from tools import timing
+from tools.metrics import HTTP_RESPONSES, IN_FLIGHT, observe_stage
+
+# The scope of the request being handled; routing fills in its path_params.
+_scope: ContextVar[Optional[Scope]] = ContextVar("request_scope", default=None)
+
+
+def _route_labels(scope: Optional[Scope]) -> Tuple[str, str]:
+    params: Dict[str, Any] = (scope or {}).get("path_params") or {}
+    return params.get("service", ""), params.get("entity", "")
+
+
+class MetricsMiddleware:
+    """Count in-flight requests and status codes and time whole requests.
+
+    Requests are labelled with their service and entity set once routing
+    accepted them; failed requests are not, so made-up names in URLs do
+    not become label values.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.metrics:
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = IN_FLIGHT.labels("http")
+        in_flight.inc()
+        token = _scope.set(scope)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _scope.reset(token)
+            in_flight.dec()
+            HTTP_RESPONSES.labels(str(status)).inc()
+            labels = _route_labels(scope) if status < 400 else ("", "")
+            observe_stage("request", elapsed, *labels)
+
+
+class ServerTimingMiddleware:
+    """Send the request's stage durations in a ``Server-Timing`` header.
+
+    Stages recorded until the response starts are included (context lookup,
+    cache, backend calls, decoding, encoding), plus ``total`` up to then.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = timing.start()
+        collected = timing.current()
+        start = time.perf_counter()
+
+        async def send_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and collected is not None:
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", collected.header(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timing)
+        finally:
+            timing.stop(token)
+
+
+class TimedJSONResponse(JSONResponse):
+    """``JSONResponse`` that records its encoding time as the ``encode`` stage."""
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = super().render(content)
+        observe_stage("encode", time.perf_counter() - start, *_route_labels(_scope.get()))
+        return body
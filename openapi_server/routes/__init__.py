@@ -1,5 +1,14 @@
 """API routes for the OData bridge."""
 
-from .odata import router
+from fastapi import APIRouter
+
+from .admin import router as admin_router
+from .health import router as health_router
+from .odata import router as odata_router
+
+router = APIRouter()
+router.include_router(health_router)
+router.include_router(admin_router)
+router.include_router(odata_router)
 
 __all__ = ["router"]
@@ -0,0 +1,40 @@
+"""Operator endpoints, enabled by setting ``admin_token``."""
+
+from __future__ import annotations
+
+import hmac
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from config import settings
+from tools.profiler import ProfilerBusy, collapsed, sample_stacks
+
+router = APIRouter(prefix="/admin")
+
+
+def _check_token(token: str) -> None:
+    if not settings.admin_token:
+        # Not configured: behave as if the endpoints did not exist.
+        raise HTTPException(404, "Not Found")
+    if not hmac.compare_digest(token.encode(), settings.admin_token.encode()):
+        raise HTTPException(403, "Invalid admin token")
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+def profile(
+    seconds: float = Query(5.0, gt=0, description="How long to sample"),
+    interval_ms: float = Query(5.0, ge=1, description="Time between samples"),
+    x_admin_token: str = Header("", alias="X-Admin-Token"),
+) -> PlainTextResponse:
+    """Sample all threads and return collapsed stacks for a flame graph.
+
+    Runs on a worker thread so the event loop keeps serving (and is
+    sampled) meanwhile. ``seconds`` is capped at ``profile_max_seconds``.
+    """
+    _check_token(x_admin_token)
+    try:
+        stacks = sample_stacks(min(seconds, settings.profile_max_seconds), interval_ms / 1000)
+    except ProfilerBusy as exc:
+        raise HTTPException(409, str(exc))
+    return PlainTextResponse(collapsed(stacks))
@@ -0,0 +1,18 @@
+"""Readiness reporting for load balancers."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from ..warmup import progress
+
+router = APIRouter()
+
+
+@router.get("/ready")
+def ready() -> Any:
+    """Return 200 once the warm-up (if enabled) has finished, 503 before."""
+    return JSONResponse(progress.snapshot(), status_code=200 if progress.ready else 503)
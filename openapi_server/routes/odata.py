@@ -1,15 +1,43 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, FrozenSet, KeysView, List, Optional, Tuple
+import threading
+import time
 
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
 from tools.loader import load_metadata, list_services
-from tools.parser import parse_metadata
+from tools.parser import parse_metadata, summarize_metadata
 from tools.invoker import ODataInvoker
+from tools.async_invoker import AsyncODataInvoker
+from tools.batch import arun_batch, run_batch, validate_operations
+from tools.cache import response_cache
+from tools.limiter import limiter_stats
+from tools.resilience import backend_stats
+from tools.metadata_cache import content_hash, metadata_cache
+from tools.metrics import PREFIX, REGISTRY, Counter, Metric, family, hit_ratio, observe_stage, stage_timer
+from tools.precompressed import IDENTITY, Precompressed, negotiate
+from tools.paging import (
+    NdjsonWriter,
+    acount_rows,
+    afirst_page,
+    aiter_fanout,
+    aiter_pages,
+    andjson_pages,
+    count_rows,
+    iter_fanout,
+    iter_pages,
+    ndjson_pages,
+)
+from tools.registry import ContextRegistry
+from tools.serialize import dumps, strip_metadata
+from tools.singleflight import async_flights, flights
 from config import settings
 from models.dynamic import build_models
+from ..schema import build_service_openapi
 
 
 def _quote_value(value: str, edm_type: str) -> str:
@@ -49,16 +77,111 @@ def _format_keys(raw_keys: str, key_types: Dict[str, str]) -> str:
     return raw_keys
 
 
+# Parsed metadata and models take a few times the size of the XML itself.
+_CONTEXT_SIZE_FACTOR = 5
+
+
 class ServiceContext:
-    def __init__(self, name: str) -> None:
-        xml, base_url = load_metadata(name)
+    def __init__(
+        self,
+        name: str,
+        loaded: Optional[Tuple[str, str]] = None,
+        parsed: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Build the context for ``name``.
+
+        ``loaded`` is the ``(xml, base_url)`` pair from ``load_metadata`` and
+        ``parsed`` the matching ``parse_metadata`` result, for callers that
+        already have them (e.g. the warm-up, which parses in worker processes).
+        """
+        if loaded is None:
+            with stage_timer("load_metadata", name):
+                loaded = load_metadata(name)
+        xml, base_url = loaded
         self.name = name
         self.metadata_xml = xml
+        self.metadata_hash = content_hash(xml)
         self.base_url = base_url or settings.base_url
-        self.parsed = parse_metadata(xml)
-        self.models = build_models(self.parsed)
+        cached = None
+        if parsed is None and metadata_cache:
+            cached = metadata_cache.load(name, self.metadata_hash)
+        if cached:
+            self.parsed = cached["parsed"]
+            self.key_types = cached["key_types"]
+        else:
+            if parsed is None:
+                with stage_timer("parse_metadata", name):
+                    parsed = parse_metadata(xml)
+            self.parsed = parsed
+            self.key_types = self._extract_key_types()
+            if metadata_cache:
+                metadata_cache.store(
+                    name, self.metadata_hash, {"parsed": self.parsed, "key_types": self.key_types}
+                )
+        self.selectable = self._extract_selectable()
+        # Models are built on first use, so they are timed as they are created.
+        self.models = build_models(
+            self.parsed, lambda _type, seconds: observe_stage("build_models", seconds, name)
+        )
         self.invoker = ODataInvoker(self.base_url)
-        self.key_types = self._extract_key_types()
+        self.async_invoker = AsyncODataInvoker(self.base_url)
+        self._documents: Dict[str, Precompressed] = {}
+        self._documents_lock = threading.Lock()
+
+    @property
+    def entity_sets(self) -> KeysView[str]:
+        """Entity set names, checked without building any model."""
+        return self.key_types.keys()
+
+    @property
+    def approx_bytes(self) -> int:
+        """Rough memory footprint: the XML plus its parsed form and models."""
+        return len(self.metadata_xml) * _CONTEXT_SIZE_FACTOR
+
+    def _document(self, kind: str, build: Callable[[], Tuple[bytes, str]]) -> Precompressed:
+        doc = self._documents.get(kind)
+        if doc is None:
+            with self._documents_lock:
+                doc = self._documents.get(kind)
+                if doc is None:
+                    body, media_type = build()
+                    tag = self.metadata_hash if kind == "xml" else f"{self.metadata_hash}-{kind}"
+                    doc = self._documents[kind] = Precompressed(body, media_type, tag)
+        return doc
+
+    def metadata_document(self, format_: str = "xml") -> Precompressed:
+        """``$metadata`` as EDMX (``xml``) or as a JSON summary, built once."""
+        if format_ == "json":
+            return self._document(
+                "json",
+                lambda: (dumps(summarize_metadata(self.parsed)).encode("utf-8"), "application/json"),
+            )
+        return self._document("xml", lambda: (self.metadata_xml.encode("utf-8"), "application/xml"))
+
+    def openapi_document(self) -> Precompressed:
+        """Typed OpenAPI document for this service, built on first use.
+
+        It builds every entity model, so it is memoized here; a reloaded
+        service gets a new context and therefore a new document.
+        """
+        return self._document(
+            "openapi",
+            lambda: (
+                dumps(
+                    build_service_openapi(
+                        self.name,
+                        self.metadata_hash[:12],
+                        self.models["entity_sets"],
+                        self.parsed.get("functions", []),
+                    )
+                ).encode("utf-8"),
+                "application/json",
+            ),
+        )
+
+    def cache_ttl(self, entity_set: str) -> float:
+        """Response cache TTL configured for ``entity_set``."""
+        return settings.cache_ttl_for(self.name, entity_set)
 
     def _extract_key_types(self) -> Dict[str, Dict[str, str]]:
         """Map entity set names to their key property EDM types."""
@@ -75,96 +198,476 @@ class ServiceContext:
             types[es["name"]] = key_props
         return types
 
+    def _extract_selectable(self) -> Dict[str, FrozenSet[str]]:
+        """Map entity set names to their property and navigation names."""
+        et_map = {et["name"]: et for et in self.parsed.get("entity_types", [])}
+        names: Dict[str, FrozenSet[str]] = {}
+        for es in self.parsed.get("entity_sets", []):
+            et = et_map.get(es.get("entity_type"))
+            if et:
+                names[es["name"]] = frozenset(
+                    [p["name"] for p in et.get("properties", [])]
+                    + [n["name"] for n in et.get("navigation", [])]
+                )
+        return names
 
-CACHE: Dict[str, ServiceContext] = {}
+
+CACHE: ContextRegistry[ServiceContext] = ContextRegistry(
+    ServiceContext,
+    sizeof=lambda ctx: ctx.approx_bytes,
+    max_bytes=settings.context_cache_max_bytes,
+    negative_ttl=settings.negative_cache_ttl,
+    max_negative=settings.max_negative_entries,
+)
 
 
 def get_ctx(service: str) -> ServiceContext:
+    try:
+        with stage_timer("context", service):
+            return CACHE.get_or_build(service)
+    except FileNotFoundError:
+        raise HTTPException(404, "Unknown service")
+
+
+async def aget_ctx(service: str) -> ServiceContext:
+    """Return the context for ``service`` without blocking the event loop.
+
+    Warm contexts are served straight from the cache; building a new one
+    parses metadata, so that work is pushed to the threadpool.
+    """
+    start = time.perf_counter()
     ctx = CACHE.get(service)
-    if not ctx:
-        try:
-            ctx = ServiceContext(service)
-        except FileNotFoundError:
-            raise HTTPException(404, "Unknown service")
-        CACHE[service] = ctx
-    return ctx
+    if ctx:
+        observe_stage("context", time.perf_counter() - start, service)
+        return ctx
+    return await run_in_threadpool(get_ctx, service)
 
 
-router = APIRouter()
+def _check_entity_set(ctx: ServiceContext, entity: str) -> None:
+    if entity not in ctx.entity_sets:
+        raise HTTPException(404, "Unknown entity set")
+
+
+def _select(
+    ctx: ServiceContext, entity: str, select: Optional[str], expand: Optional[str] = None
+) -> Optional[str]:
+    """Validate ``$select`` for ``entity`` and fall back to the configured default.
+
+    ``*`` asks for every property and is not sent to the backend. Paths such
+    as ``ToItems/Name`` are checked on their first segment only. The default
+    is extended with the navigation properties in ``expand``, which the
+    backend would otherwise leave out.
+    """
+    if select is None:
+        select = settings.default_select_for(ctx.name, entity)
+        if select is not None and expand and select.strip() != "*":
+            chosen = [item.strip() for item in select.split(",")]
+            for item in expand.split(","):
+                nav = item.split("/", 1)[0].strip()
+                if nav and nav not in chosen:
+                    chosen.append(nav)
+            select = ",".join(chosen)
+    if select is None or select.strip() == "*":
+        return None
+    allowed = ctx.selectable.get(entity, frozenset())
+    items = [item.strip() for item in select.split(",") if item.strip()]
+    unknown = [i for i in items if i != "*" and i.split("/", 1)[0] not in allowed]
+    if unknown:
+        raise HTTPException(400, f"Unknown property in $select: {', '.join(unknown)}")
+    return ",".join(items) or None
+
+
+# Backend response headers kept when a body is streamed through unchanged.
+_PASSTHROUGH_HEADERS = ("content-type", "content-encoding", "content-length", "etag")
+
+
+async def _passthrough(
+    ctx: ServiceContext, request: Request, path: str, params: Dict[str, Any]
+) -> StreamingResponse:
+    """Stream the backend body to the client without decoding it.
+
+    The client's ``Accept-Encoding`` is forwarded, so gzip bodies are passed
+    on as-is instead of being decompressed and compressed again.
+    """
+    headers = {"Accept-Encoding": request.headers.get("accept-encoding", "identity")}
+    resp = await ctx.async_invoker.open_stream("GET", path, params, headers)
+    return StreamingResponse(
+        resp.aiter_raw(),
+        status_code=resp.status_code,
+        headers={h: resp.headers[h] for h in _PASSTHROUGH_HEADERS if h in resp.headers},
+        background=BackgroundTask(resp.aclose),
+    )
+
+
+async def _document_response(request: Request, doc: Precompressed) -> Response:
+    """Send ``doc`` in the best accepted coding, or 304 if the client has it."""
+    coding = negotiate(request.headers.get("accept-encoding", ""))
+    headers = {"ETag": doc.etag(coding), "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if doc.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    body = doc.cached(coding)
+    if body is None:
+        body = await run_in_threadpool(doc.body, coding)
+    if coding != IDENTITY:
+        headers["Content-Encoding"] = coding
+    return Response(body, media_type=doc.media_type, headers=headers)
+
+
+def _ndjson_writer(row_fn: Optional[Callable[[Any], Any]] = None) -> NdjsonWriter:
+    return NdjsonWriter(settings.paging_max_rows, settings.paging_max_bytes, row_fn)
+
+
+def _stable_order(ctx: ServiceContext, entity: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Order by the entity keys when no ``$orderby`` is given.
+
+    Parallel ``$skip`` windows are only consistent under a total order.
+    """
+    if params.get("$orderby") is None and ctx.key_types.get(entity):
+        params = dict(params, **{"$orderby": ",".join(ctx.key_types[entity])})
+    return params
+
+
+def _use_passthrough(ttl: float) -> bool:
+    # Cached reads need the decoded body, so they are never streamed.
+    return settings.passthrough and ttl <= 0
+
+
+def _list_params(
+    filter_: Optional[str],
+    top: Optional[int],
+    skip: Optional[int],
+    orderby: Optional[str],
+    expand: Optional[str],
+    count: Optional[bool],
+    select: Optional[str] = None,
+) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    if filter_ is not None:
+        params["$filter"] = filter_
+    if top is not None:
+        params["$top"] = top
+    if skip is not None:
+        params["$skip"] = skip
+    if orderby is not None:
+        params["$orderby"] = orderby
+    if expand is not None:
+        params["$expand"] = expand
+    if count is not None:
+        params["$count"] = str(count).lower()
+    if select is not None:
+        params["$select"] = select
+    return params
+
+
+def _invoke_args(data: Dict[str, Any]) -> Tuple[str, str, str, Any]:
+    service = data.get("service")
+    path = data.get("path")
+    if not service or not path:
+        raise HTTPException(400, "service and path required")
+    return service, path, data.get("method", "GET"), data.get("json")
+
+
+def _batch_args(data: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+    service = data.get("service")
+    operations = data.get("operations")
+    if not service or not isinstance(operations, list) or not operations:
+        raise HTTPException(400, "service and operations required")
+    try:
+        validate_operations(operations)
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    return service, operations
+
+
+# Synchronous variants backed by the blocking invoker. They are used by the
+# JSON-RPC server and scripts; the HTTP routes below are the async versions.
 
 
-@router.get("/services")
 def services() -> Any:
     return list_services()
 
 
-@router.get("/services/{service}/metadata")
-def metadata(service: str) -> Any:
+def metadata(service: str, format_: str = "xml") -> Any:
+    """The EDMX text, or its summary as a dict with ``format_="json"``."""
     ctx = get_ctx(service)
-    return JSONResponse(content=ctx.metadata_xml)
+    if format_ == "json":
+        return summarize_metadata(ctx.parsed)
+    return ctx.metadata_xml
 
 
-@router.get("/{service}/{entity}({keys})")
 def get_entity(
     service: str,
     entity: str,
     keys: str,
-    expand: Optional[str] = Query(None, alias="$expand"),
+    expand: Optional[str] = None,
+    select: Optional[str] = None,
 ) -> Any:
     ctx = get_ctx(service)
-    if entity not in ctx.models.get("entity_sets", {}):
-        raise HTTPException(404, "Unknown entity set")
+    _check_entity_set(ctx, entity)
     params: Dict[str, Any] = {}
     if expand is not None:
         params["$expand"] = expand
+    select = _select(ctx, entity, select, expand)
+    if select is not None:
+        params["$select"] = select
     formatted = _format_keys(keys, ctx.key_types.get(entity, {}))
-    return ctx.invoker.get(f"/{service}/{entity}({formatted})", params)
+    return ctx.invoker.get(
+        f"/{service}/{entity}({formatted})", params, ttl=ctx.cache_ttl(entity)
+    )
 
 
-@router.get("/{service}/{entity}")
 def list_entities(
     service: str,
     entity: str,
-    filter_: Optional[str] = Query(None, alias="$filter"),
-    top: Optional[int] = Query(None, alias="$top"),
-    skip: Optional[int] = Query(None, alias="$skip"),
-    orderby: Optional[str] = Query(None, alias="$orderby"),
-    expand: Optional[str] = Query(None, alias="$expand"),
-    count: Optional[bool] = Query(None, alias="$count"),
+    filter_: Optional[str] = None,
+    top: Optional[int] = None,
+    skip: Optional[int] = None,
+    orderby: Optional[str] = None,
+    expand: Optional[str] = None,
+    count: Optional[bool] = None,
+    all_pages: bool = False,
+    parallel: bool = False,
+    select: Optional[str] = None,
 ) -> Any:
+    """List an entity set.
+
+    ``all_pages`` follows next links and ``parallel`` reads ``$skip``/``$top``
+    windows concurrently; both return all rows as NDJSON text, without
+    OData metadata if ``strip_metadata`` is set, as for other tool results.
+    """
     ctx = get_ctx(service)
-    if entity not in ctx.models.get("entity_sets", {}):
-        raise HTTPException(404, "Unknown entity set")
-    params: Dict[str, Any] = {}
-    if filter_ is not None:
-        params["$filter"] = filter_
-    if top is not None:
-        params["$top"] = top
-    if skip is not None:
-        params["$skip"] = skip
-    if orderby is not None:
-        params["$orderby"] = orderby
-    if expand is not None:
-        params["$expand"] = expand
-    if count is not None:
-        params["$count"] = str(count).lower()
-    return ctx.invoker.get(f"/{service}/{entity}", params)
+    _check_entity_set(ctx, entity)
+    params = _list_params(
+        filter_, top, skip, orderby, expand, count, _select(ctx, entity, select, expand)
+    )
+    path = f"/{service}/{entity}"
+    row_fn = strip_metadata if settings.strip_metadata else None
+    if parallel:
+        params = _stable_order(ctx, entity, params)
+        pages = iter_fanout(
+            ctx.invoker, path, params, count_rows(ctx.invoker, path, params),
+            settings.fanout_parallelism, settings.fanout_window,
+        )
+        return b"".join(ndjson_pages(pages, _ndjson_writer(row_fn))).decode("utf-8")
+    if all_pages:
+        pages = iter_pages(ctx.invoker, path, params)
+        return b"".join(ndjson_pages(pages, _ndjson_writer(row_fn))).decode("utf-8")
+    return ctx.invoker.get(path, params, ttl=ctx.cache_ttl(entity))
 
 
-@router.post("/invoke")
 def invoke(data: Dict[str, Any]) -> Any:
-    service = data.get("service")
-    path = data.get("path")
-    method = data.get("method", "GET")
-    json_body = data.get("json")
-    if not service or not path:
-        raise HTTPException(400, "service and path required")
+    service, path, method, json_body = _invoke_args(data)
     ctx = get_ctx(service)
     return ctx.invoker.request(method, f"/{service}{path}", json=json_body)
 
 
-@router.post("/{service}/function/{name}")
 def call_function(service: str, name: str, body: Dict[str, Any]) -> Any:
     ctx = get_ctx(service)
     return ctx.invoker.post(f"/{service}/{name}", body)
 
+
+def batch(data: Dict[str, Any]) -> Any:
+    """Run many operations through the backend ``$batch`` endpoint."""
+    service, operations = _batch_args(data)
+    ctx = get_ctx(service)
+    results = run_batch(ctx.invoker, service, operations, settings.batch_max_operations)
+    return {"results": results}
+
+
+router = APIRouter()
+
+
+@router.get("/services")
+def services_route() -> Any:
+    return services()
+
+
+@router.get("/stats")
+def stats() -> Any:
+    """Counters for the context registry, response cache, coalescing and backends."""
+    return {
+        "contexts": CACHE.stats(),
+        "cache": response_cache.stats(),
+        "coalescing": {"sync": flights.stats(), "async": async_flights.stats()},
+        "limits": limiter_stats(),
+        "backends": backend_stats(),
+    }
+
+
+def _collect_stats() -> List[Metric]:
+    """Export the ``/stats`` counters as metrics on every scrape."""
+    current = stats()
+    caches = {"response": current["cache"], "contexts": current["contexts"]}
+    ratios = {}
+    for name, counts in caches.items():
+        ratio = hit_ratio(counts["hits"], counts["misses"])
+        if ratio is not None:
+            ratios[name] = ratio
+    coalescing = current["coalescing"]
+    backends = current["backends"]
+    limits = current["limits"]
+    responses = Counter(
+        PREFIX + "backend_responses_total", "Backend responses by status code.", ("backend", "status")
+    )
+    for url, counts in backends.items():
+        for status, n in counts["statuses"].items():
+            responses.labels(url, status).set(n)
+    return [
+        family(PREFIX + "cache_hits_total", "Cache hits.", "cache",
+               {k: v["hits"] for k, v in caches.items()}, "counter"),
+        family(PREFIX + "cache_misses_total", "Cache misses.", "cache",
+               {k: v["misses"] for k, v in caches.items()}, "counter"),
+        family(PREFIX + "cache_hit_ratio", "Cache hits / lookups since start.", "cache", ratios),
+        family(PREFIX + "cache_bytes", "Approximate bytes held by the cache.", "cache",
+               {k: v["bytes"] for k, v in caches.items()}),
+        family(PREFIX + "coalesced_total", "Requests that shared another request's backend call.", "mode",
+               {k: v["collapsed"] for k, v in coalescing.items()}, "counter"),
+        responses,
+        family(PREFIX + "backend_in_flight", "Backend calls waiting for a response.", "backend",
+               {k: v["in_flight"] for k, v in backends.items()}),
+        family(PREFIX + "backend_timeouts_total", "Backend attempts that timed out.", "backend",
+               {k: v["timeouts"] for k, v in backends.items()}, "counter"),
+        family(PREFIX + "backend_errors_total", "Backend attempts without a response.", "backend",
+               {k: v["errors"] for k, v in backends.items()}, "counter"),
+        family(PREFIX + "backend_retries_total", "Backend calls sent again.", "backend",
+               {k: v["retries"] for k, v in backends.items()}, "counter"),
+        family(PREFIX + "backend_hedges_total", "Hedged second attempts.", "backend",
+               {k: v["hedges"] for k, v in backends.items()}, "counter"),
+        family(PREFIX + "backend_concurrency_limit", "Adaptive concurrency limit.", "backend",
+               {k: v["limit"] for k, v in limits.items()}),
+        family(PREFIX + "backend_circuit_open", "1 while the circuit breaker is open.", "backend",
+               {k: float(v["state"] == "open") for k, v in limits.items()}),
+    ]
+
+
+REGISTRY.add_collector(_collect_stats)
+
+
+@router.get("/metrics")
+def metrics_route() -> Response:
+    """Metrics in the Prometheus text format."""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/services/{service}/metadata")
+async def metadata_route(
+    request: Request,
+    service: str,
+    format_: str = Query(
+        "xml", alias="format", pattern="^(xml|json)$",
+        description="xml: the EDMX document; json: a compact summary of sets, keys and types",
+    ),
+) -> Response:
+    """Serve metadata from bytes built once per service context.
+
+    gzip (and brotli, if installed) bodies are compressed on first use and
+    reused. The ETag derives from the metadata hash; a matching
+    ``If-None-Match`` gets a 304.
+    """
+    ctx = await aget_ctx(service)
+    return await _document_response(request, ctx.metadata_document(format_))
+
+
+@router.get("/services/{service}/openapi.json")
+async def service_openapi_route(request: Request, service: str) -> Response:
+    """OpenAPI document with typed paths and schemas for each entity set."""
+    ctx = await aget_ctx(service)
+    doc = await run_in_threadpool(ctx.openapi_document)
+    return await _document_response(request, doc)
+
+
+@router.get("/{service}/{entity}({keys})")
+async def get_entity_async(
+    request: Request,
+    service: str,
+    entity: str,
+    keys: str,
+    expand: Optional[str] = Query(None, alias="$expand"),
+    select: Optional[str] = Query(None, alias="$select", description="Properties to return; * for all"),
+) -> Any:
+    ctx = await aget_ctx(service)
+    _check_entity_set(ctx, entity)
+    params: Dict[str, Any] = {}
+    if expand is not None:
+        params["$expand"] = expand
+    select = _select(ctx, entity, select, expand)
+    if select is not None:
+        params["$select"] = select
+    formatted = _format_keys(keys, ctx.key_types.get(entity, {}))
+    path = f"/{service}/{entity}({formatted})"
+    ttl = ctx.cache_ttl(entity)
+    if _use_passthrough(ttl):
+        return await _passthrough(ctx, request, path, params)
+    return await ctx.async_invoker.get(path, params, ttl=ttl)
+
+
+@router.get("/{service}/{entity}")
+async def list_entities_async(
+    request: Request,
+    service: str,
+    entity: str,
+    filter_: Optional[str] = Query(None, alias="$filter"),
+    top: Optional[int] = Query(None, alias="$top"),
+    skip: Optional[int] = Query(None, alias="$skip"),
+    orderby: Optional[str] = Query(None, alias="$orderby"),
+    expand: Optional[str] = Query(None, alias="$expand"),
+    count: Optional[bool] = Query(None, alias="$count"),
+    select: Optional[str] = Query(None, alias="$select", description="Properties to return; * for all"),
+    all_pages: bool = Query(False, description="Follow next links and stream all rows as NDJSON"),
+    parallel: bool = Query(False, description="Read $skip/$top windows concurrently and stream all rows as NDJSON"),
+) -> Any:
+    ctx = await aget_ctx(service)
+    _check_entity_set(ctx, entity)
+    params = _list_params(
+        filter_, top, skip, orderby, expand, count, _select(ctx, entity, select, expand)
+    )
+    path = f"/{service}/{entity}"
+    if parallel or all_pages:
+        # $count and the first page run before the response starts, so their
+        # failures get a real status code; later ones end in an @error line.
+        if parallel:
+            params = _stable_order(ctx, entity, params)
+            total = await acount_rows(ctx.async_invoker, path, params)
+            pages = aiter_fanout(
+                ctx.async_invoker, path, params, total,
+                settings.fanout_parallelism, settings.fanout_window,
+            )
+        else:
+            pages = aiter_pages(ctx.async_invoker, path, params)
+        first = await afirst_page(pages)
+        return StreamingResponse(
+            andjson_pages(pages, _ndjson_writer(), first), media_type="application/x-ndjson"
+        )
+    ttl = ctx.cache_ttl(entity)
+    if _use_passthrough(ttl):
+        return await _passthrough(ctx, request, path, params)
+    return await ctx.async_invoker.get(path, params, ttl=ttl)
+
+
+@router.post("/invoke")
+async def invoke_async(data: Dict[str, Any]) -> Any:
+    service, path, method, json_body = _invoke_args(data)
+    ctx = await aget_ctx(service)
+    return await ctx.async_invoker.request(method, f"/{service}{path}", json=json_body)
+
+
+@router.post("/batch")
+async def batch_async(data: Dict[str, Any]) -> Any:
+    """Run many operations through the backend ``$batch`` endpoint.
+
+    The body is ``{"service": ..., "operations": [...]}``. Each operation is
+    ``{"method": "GET", "path": "/Set(key)", "params": {...}}`` or
+    ``{"changeset": [{"method": "POST", "path": "/Set", "json": {...}}]}``.
+    Results are returned in the same order, split into several backend
+    batches of at most ``batch_max_operations`` requests.
+    """
+    service, operations = _batch_args(data)
+    ctx = await aget_ctx(service)
+    results = await arun_batch(ctx.async_invoker, service, operations, settings.batch_max_operations)
+    return {"results": results}
+
+
+@router.post("/{service}/function/{name}")
+async def call_function_async(service: str, name: str, body: Dict[str, Any]) -> Any:
+    ctx = await aget_ctx(service)
+    return await ctx.async_invoker.post(f"/{service}/{name}", body)
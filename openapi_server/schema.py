@@ -0,0 +1,140 @@
+"""OpenAPI documents: 3.0 conversion and typed per-service schemas."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping
+
+from pydantic.json_schema import models_json_schema
+
+
+def _convert_to_openapi_30(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert OpenAPI 3.1 schema pieces to a 3.0 compatible format."""
+
+    def transform(obj: Any) -> None:
+        if isinstance(obj, dict):
+            if "anyOf" in obj and len(obj["anyOf"]) == 2 and obj["anyOf"][1].get("type") == "null":
+                first = obj["anyOf"][0]
+                obj.pop("anyOf")
+                obj.update(first)
+                obj["nullable"] = True
+            for value in obj.values():
+                transform(value)
+        elif isinstance(obj, list):
+            for item in obj:
+                transform(item)
+
+    schema["openapi"] = "3.0.3"
+    transform(schema)
+    return schema
+
+
+_EDM_SCHEMAS = {
+    "Edm.Int16": {"type": "integer"},
+    "Edm.Int32": {"type": "integer"},
+    "Edm.Int64": {"type": "integer"},
+    "Edm.Byte": {"type": "integer"},
+    "Edm.Boolean": {"type": "boolean"},
+    "Edm.Decimal": {"type": "number"},
+    "Edm.Double": {"type": "number"},
+    "Edm.Single": {"type": "number"},
+    "Edm.DateTime": {"type": "string", "format": "date-time"},
+}
+
+
+def _query(name: str, schema: Dict[str, Any], description: str) -> Dict[str, Any]:
+    return {"name": name, "in": "query", "required": False, "schema": schema, "description": description}
+
+
+_SELECT = _query("$select", {"type": "string"}, "Comma separated properties to return; * for all")
+_EXPAND = _query("$expand", {"type": "string"}, "Navigation properties to expand")
+_LIST_PARAMETERS = [
+    _query("$filter", {"type": "string"}, "OData filter expression"),
+    _query("$top", {"type": "integer"}, "Maximum number of rows"),
+    _query("$skip", {"type": "integer"}, "Rows to skip"),
+    _query("$orderby", {"type": "string"}, "Sort order"),
+    _EXPAND,
+    _SELECT,
+    _query("$count", {"type": "boolean"}, "Include the total count"),
+    _query("all_pages", {"type": "boolean"}, "Follow next links and stream all rows as NDJSON"),
+    _query("parallel", {"type": "boolean"}, "Read $skip/$top windows concurrently and stream all rows as NDJSON"),
+]
+
+
+def _envelope(schema: Dict[str, Any], description: str) -> Dict[str, Any]:
+    """An OData V2 ``{"d": ...}`` JSON response."""
+    body = {"type": "object", "properties": {"d": schema}}
+    return {"200": {"description": description, "content": {"application/json": {"schema": body}}}}
+
+
+def build_service_openapi(
+    service: str,
+    version: str,
+    entity_sets: Mapping[str, Dict[str, Any]],
+    functions: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """OpenAPI 3.0 document with one typed path per entity set of ``service``.
+
+    ``entity_sets`` is ``build_models(...)["entity_sets"]``; every model is
+    built here, so callers should memoize the result.
+    """
+    models = {name: entity_sets[name]["model"] for name in entity_sets}
+    refs, defs = models_json_schema(
+        [(model, "validation") for model in dict.fromkeys(models.values())],
+        ref_template="#/components/schemas/{model}",
+    )
+    paths: Dict[str, Any] = {}
+    for name, model in models.items():
+        ref = refs[(model, "validation")]
+        paths[f"/{service}/{name}"] = {
+            "get": {
+                "tags": [name],
+                "operationId": f"list_{name}",
+                "summary": f"List {name}",
+                "parameters": _LIST_PARAMETERS,
+                "responses": _envelope(
+                    {"type": "object", "properties": {"results": {"type": "array", "items": ref}}},
+                    f"{name} rows",
+                ),
+            }
+        }
+        keys = ", ".join(entity_sets[name]["keys"])
+        paths[f"/{service}/{name}({{keys}})"] = {
+            "get": {
+                "tags": [name],
+                "operationId": f"get_{name}",
+                "summary": f"Get one {name} entity",
+                "parameters": [
+                    {
+                        "name": "keys",
+                        "in": "path",
+                        "required": True,
+                        "schema": {"type": "string"},
+                        "description": f"Key values ({keys}), e.g. 1 or Key1='a',Key2=2",
+                    },
+                    _EXPAND,
+                    _SELECT,
+                ],
+                "responses": _envelope(ref, f"One {name} entity"),
+            }
+        }
+    for fn in functions:
+        properties = {p["name"]: _EDM_SCHEMAS.get(p["type"], {"type": "string"}) for p in fn["parameters"]}
+        paths[f"/{service}/function/{fn['name']}"] = {
+            "post": {
+                "tags": ["functions"],
+                "operationId": f"call_{fn['name']}",
+                "summary": f"Call function import {fn['name']} ({fn['http_method']} on the backend)",
+                "requestBody": {
+                    "required": True,
+                    "content": {"application/json": {"schema": {"type": "object", "properties": properties}}},
+                },
+                "responses": {"200": {"description": "Function result"}},
+            }
+        }
+    document = {
+        "openapi": "3.1.0",
+        "info": {"title": f"{service} (MCP OData Bridge)", "version": version},
+        "paths": paths,
+        "components": {"schemas": defs.get("$defs", {})},
+    }
+    return _convert_to_openapi_30(document)
@@ -0,0 +1,174 @@
+"""Build service contexts before traffic arrives."""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+from config import settings
+from tools.loader import list_services, load_metadata
+from tools.metadata_cache import content_hash, metadata_cache
+from tools.parser import parse_metadata
+from .routes.odata import CACHE, ServiceContext
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupProgress:
+    """Thread-safe progress of the warm-up, reported by ``GET /ready``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.state = "disabled"
+        self.total = 0
+        self.done = 0
+        self.failed: List[str] = []
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state in ("disabled", "done")
+
+    def begin(self, total: int) -> None:
+        with self._lock:
+            self.state = "running"
+            self.total = total
+            self.started = time.monotonic()
+
+    def advance(self, failed: Optional[str] = None) -> None:
+        with self._lock:
+            self.done += 1
+            if failed is not None:
+                self.failed.append(failed)
+
+    def finish(self) -> None:
+        """End the warm-up; it only counts as done if every service was handled."""
+        with self._lock:
+            self.state = "done" if self.done >= self.total else "incomplete"
+            self.finished = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            end = self.finished or time.monotonic()
+            return {
+                "ready": self.ready,
+                "state": self.state,
+                "total": self.total,
+                "done": self.done,
+                "failed": list(self.failed),
+                "elapsed": round(end - self.started, 3) if self.started else 0.0,
+            }
+
+
+progress = WarmupProgress()
+
+
+def select_services(available: List[str], listed: List[str], only_listed: bool) -> List[str]:
+    """Order ``available`` with ``listed`` services first, in their given order."""
+    known = set(available)
+    first = [name for name in listed if name in known]
+    if only_listed:
+        return first
+    chosen = set(first)
+    return first + [name for name in available if name not in chosen]
+
+
+def _install(name: str, loaded: Tuple[str, str], parsed: Optional[Dict[str, Any]]) -> None:
+    CACHE.get_or_build(name, lambda n: ServiceContext(n, loaded, parsed))
+
+
+def _keep_recent(names: List[str]) -> None:
+    """Make ``names`` the most recently used contexts, the first one last.
+
+    Priority services are warmed first and would otherwise be the first
+    ones the registry evicts when the warm-up exceeds its memory cap.
+    """
+    for name in reversed(names):
+        CACHE.touch(name)
+
+
+def warm_up(services: Optional[List[str]] = None, workers: Optional[int] = None) -> None:
+    """Build contexts for ``services``, parsing XML in a process pool.
+
+    XML is loaded in this thread and parsed by the pool; at most two
+    documents per worker are in flight so memory stays bounded. Services
+    already present in the on-disk metadata cache skip the pool. Services
+    listed in ``warmup_services`` are kept most recently used throughout.
+
+    If a worker dies (e.g. out of memory), the services in flight are
+    reported as failed and the rest are parsed in this process.
+    """
+    if services is None:
+        services = select_services(list_services(), settings.warmup_services, settings.warmup_only_listed)
+    listed = set(settings.warmup_services)
+    priority = [name for name in services if name in listed]
+    workers = workers or settings.warmup_workers or os.cpu_count() or 1
+    evictions = CACHE.evictions
+    progress.begin(len(services))
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    pending: Deque[Tuple[str, Tuple[str, str], Future]] = deque()
+
+    def complete(name: str, loaded: Tuple[str, str], future: Optional[Future]) -> None:
+        try:
+            _install(name, loaded, future.result() if future else None)
+        except Exception as exc:
+            logger.warning("Warm-up of %s failed: %s", name, exc)
+            progress.advance(failed=name)
+        else:
+            progress.advance()
+        if priority:
+            _keep_recent(priority)
+
+    try:
+        for name in services:
+            try:
+                loaded = load_metadata(name)
+            except Exception as exc:
+                logger.warning("Warm-up of %s failed: %s", name, exc)
+                progress.advance(failed=name)
+                continue
+            future = None
+            if pool is not None and not (metadata_cache and metadata_cache.has(name, content_hash(loaded[0]))):
+                try:
+                    future = pool.submit(parse_metadata, loaded[0])
+                except BrokenProcessPool:
+                    logger.warning("Warm-up process pool broke; parsing the remaining services in-process")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = None
+            if future is None:
+                complete(name, loaded, None)
+                continue
+            pending.append((name, loaded, future))
+            while len(pending) >= 2 * workers:
+                complete(*pending.popleft())
+        while pending:
+            complete(*pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        progress.finish()
+        logger.info("Warm-up finished: %s", progress.snapshot())
+        evicted = CACHE.evictions - evictions
+        if evicted:
+            logger.warning(
+                "Warm-up exceeded context_cache_max_bytes (%d); %d contexts were evicted",
+                CACHE.max_bytes, evicted,
+            )
+
+
+def start_warmup() -> threading.Thread:
+    """Run :func:`warm_up` in the background; ``/ready`` reports 503 until done."""
+    progress.state = "pending"
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
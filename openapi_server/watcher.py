@@ -0,0 +1,100 @@
+"""Pick up changed service metadata without restarting."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+import logging
+import threading
+
+from config import settings
+from tools.cache import response_cache
+from tools.loader import load_metadata, service_signatures
+from tools.metadata_cache import content_hash
+from .routes.odata import CACHE, ServiceContext
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataWatcher:
+    """Poll the metadata source and refresh the affected service contexts.
+
+    Each poll compares per-service signatures (file mtime and size, or the
+    SQLite ``updated_at``/version) with the previous poll. Removed services
+    are dropped from the context registry and the response cache. Added
+    services lose any negative entry. Changed services that are warm are
+    rebuilt on the watcher thread and swapped in with ``CACHE.put``, so
+    requests keep using the old context until the new one is ready.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._signatures: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self.reloads = 0
+        self.removals = 0
+
+    def poll(self) -> None:
+        current = service_signatures()
+        previous, self._signatures = self._signatures, current
+        if previous is None:
+            return
+        for name in previous.keys() - current.keys():
+            self._remove(name)
+        for name in current.keys() - previous.keys():
+            CACHE.invalidate(name)
+        for name in current.keys() & previous.keys():
+            if current[name] != previous[name]:
+                try:
+                    self._reload(name)
+                except Exception as exc:
+                    # Keep serving the old context and retry on the next poll.
+                    logger.warning("Reload of %s failed: %s", name, exc)
+                    current[name] = previous[name]
+
+    def _remove(self, name: str) -> None:
+        ctx = CACHE.peek(name)
+        CACHE.invalidate(name)
+        if ctx is not None:
+            response_cache.invalidate([f"{ctx.base_url}/{name}/"])
+        self.removals += 1
+        logger.info("Service %s removed", name)
+
+    def _reload(self, name: str) -> None:
+        old = CACHE.peek(name)
+        if old is None:
+            # Not built yet; the next request reads the new metadata.
+            return
+        try:
+            loaded = load_metadata(name)
+        except FileNotFoundError:
+            self._remove(name)
+            return
+        base_url = loaded[1] or settings.base_url
+        if content_hash(loaded[0]) == old.metadata_hash and base_url == old.base_url:
+            return
+        CACHE.put(name, ServiceContext(name, loaded))
+        response_cache.invalidate({f"{old.base_url}/{name}/", f"{base_url}/{name}/"})
+        self.reloads += 1
+        logger.info("Service %s reloaded", name)
+
+    def run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Metadata watch failed")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def start_watcher(interval: Optional[float] = None) -> MetadataWatcher:
+    """Poll for metadata changes every ``interval`` seconds in the background."""
+    watcher = MetadataWatcher(interval or settings.watch_interval)
+    # Take the baseline now so changes made during startup are not missed.
+    try:
+        watcher.poll()
+    except Exception:
+        logger.exception("Metadata watch failed")
+    threading.Thread(target=watcher.run, name="metadata-watcher", daemon=True).start()
+    return watcher
@@ -3,5 +3,7 @@
 from .loader import load_metadata, list_services
 from .parser import parse_metadata
 from .invoker import ODataInvoker
+from .async_invoker import AsyncODataInvoker
+from .cache import ResponseCache, response_cache
 
-__all__ = ["load_metadata", "list_services", "parse_metadata", "ODataInvoker"]
+__all__ = ["load_metadata", "list_services", "parse_metadata", "ODataInvoker", "AsyncODataInvoker", "ResponseCache", "response_cache"]
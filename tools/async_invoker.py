@@ -0,0 +1,285 @@
+"""Asynchronous HTTP proxy for backend OData calls."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+import weakref
+import httpx
+
+from config import settings
+from .cache import CacheEntry, ResponseCache, cache_key, response_cache
+from .invoker import COALESCED_METHODS
+from .limiter import OVERLOAD_STATUSES, get_limiter
+from .log import payload, payload_logger
+from .metrics import path_labels, stage_timer
+from .resilience import (
+    HEDGED_METHODS,
+    IDEMPOTENT_METHODS,
+    RETRY_STATUSES,
+    backoff_delay,
+    get_backend_stats,
+    timeouts,
+)
+from .singleflight import AsyncSingleFlight, async_flights
+
+# One pooled client per event loop and backend base_url, shared by every
+# service on it. An httpx client only works on the loop it was first used on.
+# Keyed on the loop itself, not its id(), which a new loop may reuse; the
+# entries of a loop go away with it.
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_client(base_url: str) -> httpx.AsyncClient:
+    """Return the shared keep-alive client for ``base_url`` on the running loop."""
+    loop = asyncio.get_running_loop()
+    clients = _CLIENTS.get(loop)
+    if clients is None:
+        # Clients of finished loops cannot be closed any more; just drop them.
+        for owner in [owner for owner in list(_CLIENTS.keys()) if owner.is_closed()]:
+            _CLIENTS.pop(owner, None)
+        clients = _CLIENTS.setdefault(loop, {})
+    client = clients.get(base_url)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(
+            max_connections=settings.pool_max_connections,
+            max_keepalive_connections=settings.pool_max_keepalive,
+            keepalive_expiry=settings.pool_keepalive_expiry,
+        )
+        auth = None
+        if settings.user and settings.password:
+            auth = httpx.BasicAuth(settings.user, settings.password)
+        connect, read = timeouts()
+        timeout = httpx.Timeout(read, connect=connect)
+        client = httpx.AsyncClient(limits=limits, auth=auth, timeout=timeout)
+        clients[base_url] = client
+    return client
+
+
+def _discard(task: "asyncio.Task[httpx.Response]") -> None:
+    """Release the response of an attempt that lost the race."""
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(task.result().aclose())
+
+
+async def aclose_clients() -> None:
+    """Close the running loop's pooled clients, e.g. on application shutdown."""
+    clients = _CLIENTS.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+class AsyncODataInvoker:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        cache: Optional[ResponseCache] = response_cache,
+        coalescer: Optional[AsyncSingleFlight] = async_flights,
+    ) -> None:
+        base = base_url or settings.base_url
+        if not base:
+            raise ValueError("Backend base URL missing")
+        self.base_url = base.rstrip("/")
+        self.cache = cache
+        self.coalescer = coalescer if settings.coalesce else None
+        self.limiter = get_limiter(self.base_url)
+        self.stats = get_backend_stats(self.base_url)
+        self.logger = logging.getLogger(__name__)
+        self.payload_logger = payload_logger(__name__)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return _get_client(self.base_url)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+        ttl: float = 0,
+    ) -> Any:
+        """Send a backend request; cache hits return without any I/O."""
+        url = f"{self.base_url}{path}"
+        method = method.upper()
+        key = entry = None
+        headers: Dict[str, str] = {}
+        if ttl > 0 and method == "GET" and self.cache is not None:
+            with stage_timer("cache", *path_labels(path)):
+                key = cache_key(url, params)
+                entry = self.cache.get(key)
+            if entry is not None:
+                if entry.fresh:
+                    return entry.value
+                headers["If-None-Match"] = entry.etag
+        if method in COALESCED_METHODS and self.coalescer is not None:
+            flight_key = (method, cache_key(url, params), headers.get("If-None-Match"))
+            return await self.coalescer.do(
+                flight_key,
+                lambda: self._fetch(method, url, params, json, headers, key, entry, ttl),
+            )
+        return await self._fetch(method, url, params, json, headers, key, entry, ttl)
+
+    async def _send(self, req: httpx.Request, stream: bool = False) -> httpx.Response:
+        """Send with timeouts; retry idempotent and hedge safe methods.
+
+        Connection errors, timeouts and 429/502/503/504 answers are retried
+        up to ``retries`` times with jittered backoff. Calls shed by the
+        limiter are not retried.
+        """
+        retries = settings.retries if req.method in IDEMPOTENT_METHODS else 0
+        attempt = 0
+        while True:
+            try:
+                if req.method in HEDGED_METHODS:
+                    resp = await self._hedged(req, stream)
+                else:
+                    resp = await self._attempt(req, stream)
+            except httpx.TransportError:
+                if attempt >= retries:
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return resp
+                await resp.aclose()
+            attempt += 1
+            self.stats.count("retries")
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def _hedged(self, req: httpx.Request, stream: bool) -> httpx.Response:
+        """Start a second attempt if the first is slower than the backend's p95.
+
+        The first successful answer wins and the other attempt is cancelled.
+        """
+        delay = self.stats.hedge_delay()
+        if delay is None:
+            return await self._attempt(req, stream)
+        first = asyncio.ensure_future(self._attempt(req, stream))
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                tasks.clear()
+                return first.result()
+            self.stats.count("hedges")
+            second = asyncio.ensure_future(self._attempt(req, stream))
+            tasks.add(second)
+            pending = set(tasks)
+            winner = None
+            while winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None or not pending:
+                        winner = task
+                        break
+            if winner is second and winner.exception() is None:
+                self.stats.count("hedge_wins")
+            tasks.discard(winner)
+            return winner.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+                task.add_done_callback(_discard)
+
+    async def _attempt(self, req: httpx.Request, stream: bool) -> httpx.Response:
+        """One backend call through the concurrency limiter, if enabled.
+
+        For streamed responses the slot is held until the headers arrive.
+        """
+        limiter = self.limiter
+        start = limiter.acquire() if limiter is not None else time.monotonic()
+        self.stats.started()
+        try:
+            resp = await self.client.send(req, stream=stream)
+        except Exception as exc:
+            self.stats.failed(timeout=isinstance(exc, httpx.TimeoutException))
+            if limiter is not None:
+                limiter.release(start, failed=True)
+            raise
+        except BaseException:
+            self.stats.abandoned()
+            if limiter is not None:
+                limiter.abandon(start)
+            raise
+        failed = resp.status_code in OVERLOAD_STATUSES
+        self.stats.record(resp.status_code, None if failed else time.monotonic() - start)
+        if limiter is not None:
+            limiter.release(start, failed=failed)
+        return resp
+
+    async def _fetch(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        headers: Dict[str, str],
+        key: Any,
+        entry: Optional[CacheEntry],
+        ttl: float,
+    ) -> Any:
+        self.payload_logger.debug(
+            "HTTP %s %s params=%s json=%s", method, url, params, payload(json)
+        )
+        req = self.client.build_request(method, url, params=params, json=json, headers=headers)
+        with stage_timer("backend", *path_labels(url[len(self.base_url):])):
+            resp = await self._send(req)
+        self.logger.info("HTTP %s %s -> %s", method, url, resp.status_code)
+        if entry is not None and resp.status_code == 304:
+            self.cache.touch(key, ttl)
+            return entry.value
+        self.payload_logger.debug("Body %s", payload(resp.content))
+        resp.raise_for_status()
+        with stage_timer("decode", *path_labels(url[len(self.base_url):])):
+            try:
+                value = resp.json()
+            except ValueError:
+                value = resp.text
+        if key is not None:
+            self.cache.put(key, value, len(resp.content), ttl, resp.headers.get("ETag"))
+        return value
+
+    async def open_stream(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """Send a request and return the response with its body unread.
+
+        The caller iterates ``aiter_raw()`` to forward the body exactly as the
+        backend sent it (still compressed) and must ``aclose()`` it. Error
+        responses are read and raised like in :meth:`request`.
+        """
+        url = f"{self.base_url}{path}"
+        req = self.client.build_request(method.upper(), url, params=params, headers=headers)
+        with stage_timer("backend", *path_labels(path)):
+            resp = await self._send(req, stream=True)
+        self.logger.info("HTTP %s %s (stream) -> %s", method.upper(), url, resp.status_code)
+        if resp.is_error:
+            await resp.aread()
+            await resp.aclose()
+            resp.raise_for_status()
+        return resp
+
+    async def post_raw(self, path: str, content: bytes, content_type: str) -> Tuple[int, str, bytes]:
+        """POST an already encoded body (e.g. ``$batch``); return status, type and bytes."""
+        url = f"{self.base_url}{path}"
+        self.payload_logger.debug("HTTP POST %s body=%s", url, payload(content))
+        req = self.client.build_request("POST", url, content=content, headers={"Content-Type": content_type})
+        with stage_timer("backend", *path_labels(path)):
+            resp = await self._send(req)
+        self.logger.info("HTTP POST %s (%d bytes) -> %s", url, len(content), resp.status_code)
+        resp.raise_for_status()
+        return resp.status_code, resp.headers.get("Content-Type", ""), resp.content
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None, ttl: float = 0) -> Any:
+        return await self.request("GET", path, params=params, ttl=ttl)
+
+    async def post(self, path: str, json: Optional[Dict[str, Any]] = None) -> Any:
+        return await self.request("POST", path, json=json)
@@ -0,0 +1,230 @@
+"""Build and parse OData V2 ``$batch`` multipart requests."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+import asyncio
+import json
+import re
+import uuid
+
+if TYPE_CHECKING:
+    from .async_invoker import AsyncODataInvoker
+    from .invoker import ODataInvoker
+
+# An operation is {"method", "path", "params"?, "json"?} with ``path``
+# relative to the service root, or {"changeset": [operation, ...]} for
+# modifying operations that the backend applies atomically.
+Operation = Dict[str, Any]
+
+_QUERY_SAFE = "$,()'/"
+_BOUNDARY_RE = re.compile(r'boundary=(?:"([^"]+)"|([^;\s]+))', re.IGNORECASE)
+
+
+class BatchResponseError(Exception):
+    """The backend answered ``$batch`` with something that is not a batch response."""
+
+    def __init__(self, status: int, content_type: str, reason: str) -> None:
+        super().__init__(f"Invalid $batch response (HTTP {status}, {content_type or 'no content type'}): {reason}")
+        self.status = status
+        self.content_type = content_type
+        self.reason = reason
+
+
+def _validate(op: Operation, in_changeset: bool) -> None:
+    path = str(op.get("path") or "")
+    if not path.strip("/") or "://" in path:
+        raise ValueError(f"Invalid batch operation path: {op.get('path')!r}")
+    is_read = str(op.get("method", "GET")).upper() == "GET"
+    if in_changeset and is_read:
+        raise ValueError("GET operations are not allowed inside a changeset")
+    if not in_changeset and not is_read:
+        raise ValueError("Modifying operations must be placed in a changeset")
+
+
+def validate_operations(operations: List[Operation]) -> None:
+    """Raise ``ValueError`` if ``operations`` cannot be sent as a batch."""
+    for op in operations:
+        if not isinstance(op, dict):
+            raise ValueError("Batch operations must be objects")
+        if "changeset" in op:
+            if not isinstance(op["changeset"], list) or not op["changeset"]:
+                raise ValueError("changeset must be a non-empty list")
+            for sub in op["changeset"]:
+                _validate(sub, in_changeset=True)
+        else:
+            _validate(op, in_changeset=False)
+
+
+def _request_line(op: Operation) -> str:
+    path = str(op["path"]).lstrip("/")
+    if op.get("params"):
+        path = f"{path}?{urlencode(op['params'], safe=_QUERY_SAFE, quote_via=quote)}"
+    return f"{op.get('method', 'GET').upper()} {path} HTTP/1.1"
+
+
+def _http_part(op: Operation, content_id: Optional[int] = None) -> List[str]:
+    lines = ["Content-Type: application/http", "Content-Transfer-Encoding: binary"]
+    if content_id is not None:
+        lines.append(f"Content-ID: {content_id}")
+    lines += ["", _request_line(op), "Accept: application/json"]
+    body = ""
+    if op.get("json") is not None:
+        body = json.dumps(op["json"], separators=(",", ":"))
+        lines += [
+            "Content-Type: application/json",
+            f"Content-Length: {len(body.encode('utf-8'))}",
+        ]
+    return lines + ["", body]
+
+
+def build_batch(operations: List[Operation]) -> Tuple[bytes, str]:
+    """Return the multipart body and its ``Content-Type`` for ``operations``.
+
+    ``operations`` must have passed :func:`validate_operations`.
+    """
+    boundary = f"batch_{uuid.uuid4().hex}"
+    lines: List[str] = []
+    for op in operations:
+        lines.append(f"--{boundary}")
+        if "changeset" in op:
+            changeset = f"changeset_{uuid.uuid4().hex}"
+            lines += [f"Content-Type: multipart/mixed; boundary={changeset}", ""]
+            for content_id, sub in enumerate(op["changeset"], 1):
+                lines.append(f"--{changeset}")
+                lines += _http_part(sub, content_id)
+            lines.append(f"--{changeset}--")
+        else:
+            lines += _http_part(op)
+    lines.append(f"--{boundary}--")
+    body = "\r\n".join(lines) + "\r\n"
+    return body.encode("utf-8"), f"multipart/mixed; boundary={boundary}"
+
+
+def _boundary(content_type: str) -> str:
+    match = _BOUNDARY_RE.search(content_type)
+    if not match:
+        raise ValueError(f"No multipart boundary in {content_type!r}")
+    return match.group(1) or match.group(2)
+
+
+def _headers(block: str) -> Dict[str, str]:
+    headers = {}
+    for line in block.split("\n"):
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _split_parts(body: str, boundary: str) -> List[Tuple[Dict[str, str], str]]:
+    parts = []
+    for chunk in body.split(f"--{boundary}")[1:]:
+        if chunk.startswith("--"):
+            break
+        head, _, content = chunk.strip("\n").partition("\n\n")
+        parts.append((_headers(head), content))
+    return parts
+
+
+def _http_response(content: str) -> Dict[str, Any]:
+    status_line, _, rest = content.partition("\n")
+    head, _, body = rest.partition("\n\n")
+    headers = _headers(head)
+    body = body.rstrip("\n")
+    status = int(status_line.split()[1])
+    value: Any = body
+    if body and "json" in headers.get("content-type", ""):
+        try:
+            value = json.loads(body)
+        except ValueError:
+            pass
+    return {"status": status, "body": value if body else None}
+
+
+def parse_batch(content_type: str, content: bytes, operations: List[Operation]) -> List[Any]:
+    """Split a ``$batch`` response into one result per operation.
+
+    Each result is ``{"status", "body"}``; a changeset yields a list with one
+    result per sub-operation. A failed changeset, which the backend answers
+    with a single error response, repeats that error for each sub-operation.
+    """
+    text = content.decode("utf-8", errors="replace").replace("\r\n", "\n")
+    parts = _split_parts(text, _boundary(content_type))
+    results: List[Any] = []
+    for index, op in enumerate(operations):
+        if index >= len(parts):
+            missing = {"status": None, "body": "No response for operation"}
+            results.append([missing] * len(op["changeset"]) if "changeset" in op else missing)
+            continue
+        headers, part = parts[index]
+        part_type = headers.get("content-type", "")
+        if "changeset" not in op:
+            results.append(_http_response(part))
+        elif part_type.startswith("multipart/mixed"):
+            results.append([_http_response(sub) for _, sub in _split_parts(part, _boundary(part_type))])
+        else:
+            results.append([_http_response(part)] * len(op["changeset"]))
+    return results
+
+
+def _parse_response(status: int, content_type: str, content: bytes, operations: List[Operation]) -> List[Any]:
+    # parse_batch raises ValueError, which the routes treat as a bad request.
+    try:
+        return parse_batch(content_type, content, operations)
+    except (ValueError, IndexError) as exc:
+        raise BatchResponseError(status, content_type, str(exc)) from exc
+
+
+def chunk_operations(operations: List[Operation], max_operations: int) -> List[List[Operation]]:
+    """Group operations into batches of at most ``max_operations`` requests.
+
+    Changesets count as their number of requests and are never split.
+    """
+    chunks: List[List[Operation]] = []
+    current: List[Operation] = []
+    size = 0
+    for op in operations:
+        n = len(op["changeset"]) if "changeset" in op else 1
+        if current and size + n > max_operations:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(op)
+        size += n
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def run_batch(invoker: "ODataInvoker", service: str, operations: List[Operation], max_operations: int) -> List[Any]:
+    """Send ``operations`` as one or more ``$batch`` requests, in order."""
+    results: List[Any] = []
+    for chunk in chunk_operations(operations, max_operations):
+        body, content_type = build_batch(chunk)
+        status, resp_type, content = invoker.post_raw(f"/{service}/$batch", body, content_type)
+        results.extend(_parse_response(status, resp_type, content, chunk))
+    return results
+
+
+async def arun_batch(invoker: "AsyncODataInvoker", service: str, operations: List[Operation], max_operations: int) -> List[Any]:
+    """Async :func:`run_batch`.
+
+    Chunks are sent in order, like ``$batch`` runs its parts, so reads see
+    the changesets before them. Only when no chunk has a changeset are the
+    chunks sent concurrently.
+    """
+
+    async def send(chunk: List[Operation]) -> List[Any]:
+        body, content_type = build_batch(chunk)
+        status, resp_type, content = await invoker.post_raw(f"/{service}/$batch", body, content_type)
+        return _parse_response(status, resp_type, content, chunk)
+
+    chunks = chunk_operations(operations, max_operations)
+    if not any("changeset" in op for op in operations):
+        chunked = await asyncio.gather(*(send(c) for c in chunks))
+        return [result for chunk in chunked for result in chunk]
+    results: List[Any] = []
+    for chunk in chunks:
+        results.extend(await send(chunk))
+    return results
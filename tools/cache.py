@@ -0,0 +1,127 @@
+"""In-memory TTL/LRU cache for read-only backend responses."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+import threading
+import time
+
+from config import settings
+
+# Query options whose comma separated items can be reordered freely.
+_UNORDERED_OPTIONS = {"$expand", "$select"}
+
+
+def cache_key(url: str, params: Optional[Mapping[str, Any]] = None) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Return a key for ``url`` that ignores parameter order and spacing."""
+    items = []
+    for name, value in (params or {}).items():
+        if value is None:
+            continue
+        text = str(value).strip()
+        if name in _UNORDERED_OPTIONS:
+            text = ",".join(sorted(part.strip() for part in text.split(",")))
+        items.append((name, text))
+    return url, tuple(sorted(items))
+
+
+class CacheEntry:
+    __slots__ = ("value", "size", "expires", "etag")
+
+    def __init__(self, value: Any, size: int, expires: float, etag: Optional[str]) -> None:
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.etag = etag
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires
+
+
+class ResponseCache:
+    """Thread-safe LRU cache bounded by the total size of cached bodies.
+
+    Expired entries that carry an ETag are kept so the caller can revalidate
+    them with ``If-None-Match`` instead of downloading the body again.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Any, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def get(self, key: Any) -> Optional[CacheEntry]:
+        """Return the entry for ``key``; check ``fresh`` before using it."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.fresh:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            if not entry.etag:
+                self._remove(key)
+                return None
+            return entry
+
+    def put(self, key: Any, value: Any, size: int, ttl: float, etag: Optional[str] = None) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(value, size, time.monotonic() + ttl, etag)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key = next(iter(self._entries))
+                self._remove(old_key)
+                self.evictions += 1
+
+    def touch(self, key: Any, ttl: float) -> None:
+        """Extend ``key`` after the backend answered ``304 Not Modified``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires = time.monotonic() + ttl
+                self._entries.move_to_end(key)
+                self.revalidations += 1
+
+    def invalidate(self, prefixes: Optional[Iterable[str]] = None) -> None:
+        """Drop every entry, or those whose URL starts with one of ``prefixes``."""
+        with self._lock:
+            if prefixes is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            prefixes = tuple(prefixes)
+            for key in [k for k in self._entries if k[0].startswith(prefixes)]:
+                self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: Any) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+response_cache = ResponseCache(settings.cache_max_bytes)
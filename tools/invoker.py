@@ -2,16 +2,61 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional, Tuple
 import logging
+import threading
+import time
 import requests
 from requests.auth import HTTPBasicAuth
 
 from config import settings
+from .cache import CacheEntry, ResponseCache, cache_key, response_cache
+from .limiter import OVERLOAD_STATUSES, get_limiter
+from .log import payload, payload_logger
+from .metrics import path_labels, stage_timer
+from .resilience import (
+    HEDGED_METHODS,
+    IDEMPOTENT_METHODS,
+    RETRY_STATUSES,
+    backoff_delay,
+    get_backend_stats,
+    timeouts,
+)
+from .singleflight import SingleFlight, flights
+
+# Methods whose concurrent identical requests may share one backend call.
+COALESCED_METHODS = {"GET", "HEAD"}
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    """Threads that run hedged attempts, created on first use."""
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _hedge_pool_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(
+                    max_workers=settings.pool_max_connections, thread_name_prefix="hedge"
+                )
+    return _hedge_pool
+
+
+def _discard(future: "Future[requests.Response]") -> None:
+    """Close the response of an attempt that lost the race."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
 
 
 class ODataInvoker:
-    def __init__(self, base_url: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        cache: Optional[ResponseCache] = response_cache,
+        coalescer: Optional[SingleFlight] = flights,
+    ) -> None:
         base = base_url or settings.base_url
         if not base:
             raise ValueError("Backend base URL missing")
@@ -19,7 +64,12 @@ class ODataInvoker:
         self.session = requests.Session()
         if settings.user and settings.password:
             self.session.auth = HTTPBasicAuth(settings.user, settings.password)
+        self.cache = cache
+        self.coalescer = coalescer if settings.coalesce else None
+        self.limiter = get_limiter(self.base_url)
+        self.stats = get_backend_stats(self.base_url)
         self.logger = logging.getLogger(__name__)
+        self.payload_logger = payload_logger(__name__)
 
     def request(
         self,
@@ -27,22 +77,152 @@ class ODataInvoker:
         path: str,
         params: Optional[Dict[str, Any]] = None,
         json: Optional[Dict[str, Any]] = None,
+        ttl: float = 0,
     ) -> Any:
+        """Send a backend request; GETs with a ``ttl`` go through the cache."""
         url = f"{self.base_url}{path}"
-        self.logger.info(
-            "HTTP %s %s params=%s json=%s", method.upper(), url, params, json
+        method = method.upper()
+        key = entry = None
+        headers: Dict[str, str] = {}
+        if ttl > 0 and method == "GET" and self.cache is not None:
+            with stage_timer("cache", *path_labels(path)):
+                key = cache_key(url, params)
+                entry = self.cache.get(key)
+            if entry is not None:
+                if entry.fresh:
+                    return entry.value
+                headers["If-None-Match"] = entry.etag
+        if method in COALESCED_METHODS and self.coalescer is not None:
+            flight_key = (method, cache_key(url, params), headers.get("If-None-Match"))
+            return self.coalescer.do(
+                flight_key,
+                lambda: self._fetch(method, url, params, json, headers, key, entry, ttl),
+            )
+        return self._fetch(method, url, params, json, headers, key, entry, ttl)
+
+    def _send(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """Send with timeouts; retry idempotent and hedge safe methods.
+
+        Connection errors, timeouts and 429/502/503/504 answers are retried
+        up to ``retries`` times with jittered backoff. Calls shed by the
+        limiter are not retried.
+        """
+        kwargs["timeout"] = timeouts()
+        retries = settings.retries if method in IDEMPOTENT_METHODS else 0
+        attempt = 0
+        while True:
+            try:
+                if method in HEDGED_METHODS:
+                    resp = self._hedged(method, url, kwargs)
+                else:
+                    resp = self._attempt(method, url, kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= retries:
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return resp
+                resp.close()
+            attempt += 1
+            self.stats.count("retries")
+            time.sleep(backoff_delay(attempt))
+
+    def _hedged(self, method: str, url: str, kwargs: Dict[str, Any]) -> requests.Response:
+        """Start a second attempt if the first is slower than the backend's p95.
+
+        The first successful answer wins; the other one is closed when it
+        arrives, as a blocking ``requests`` call cannot be interrupted.
+        """
+        delay = self.stats.hedge_delay()
+        if delay is None:
+            return self._attempt(method, url, kwargs)
+        pool = _get_hedge_pool()
+        first = pool.submit(self._attempt, method, url, kwargs)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        self.stats.count("hedges")
+        second = pool.submit(self._attempt, method, url, kwargs)
+        pending = {first, second}
+        winner = None
+        while winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None or not pending:
+                    winner = future
+                    break
+        for future in {first, second} - {winner}:
+            future.add_done_callback(_discard)
+        if winner is second and winner.exception() is None:
+            self.stats.count("hedge_wins")
+        return winner.result()
+
+    def _attempt(self, method: str, url: str, kwargs: Dict[str, Any]) -> requests.Response:
+        """One backend call through the concurrency limiter, if enabled."""
+        limiter = self.limiter
+        start = limiter.acquire() if limiter is not None else time.monotonic()
+        self.stats.started()
+        try:
+            resp = self.session.request(method, url, **kwargs)
+        except Exception as exc:
+            self.stats.failed(timeout=isinstance(exc, requests.Timeout))
+            if limiter is not None:
+                limiter.release(start, failed=True)
+            raise
+        except BaseException:
+            self.stats.abandoned()
+            if limiter is not None:
+                limiter.abandon(start)
+            raise
+        failed = resp.status_code in OVERLOAD_STATUSES
+        self.stats.record(resp.status_code, None if failed else time.monotonic() - start)
+        if limiter is not None:
+            limiter.release(start, failed=failed)
+        return resp
+
+    def _fetch(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        headers: Dict[str, str],
+        key: Any,
+        entry: Optional[CacheEntry],
+        ttl: float,
+    ) -> Any:
+        self.payload_logger.debug(
+            "HTTP %s %s params=%s json=%s", method, url, params, payload(json)
         )
-        resp = self.session.request(method.upper(), url, params=params, json=json)
-        self.logger.info("Status %s", resp.status_code)
-        self.logger.debug("Body %s", resp.text)
+        with stage_timer("backend", *path_labels(url[len(self.base_url):])):
+            resp = self._send(method, url, params=params, json=json, headers=headers)
+        self.logger.info("HTTP %s %s -> %s", method, url, resp.status_code)
+        if entry is not None and resp.status_code == 304:
+            self.cache.touch(key, ttl)
+            return entry.value
+        self.payload_logger.debug("Body %s", payload(resp.content))
         resp.raise_for_status()
-        try:
-            return resp.json()
-        except ValueError:
-            return resp.text
+        with stage_timer("decode", *path_labels(url[len(self.base_url):])):
+            try:
+                value = resp.json()
+            except ValueError:
+                value = resp.text
+        if key is not None:
+            self.cache.put(key, value, len(resp.content), ttl, resp.headers.get("ETag"))
+        return value
+
+    def post_raw(self, path: str, content: bytes, content_type: str) -> Tuple[int, str, bytes]:
+        """POST an already encoded body (e.g. ``$batch``); return status, type and bytes."""
+        url = f"{self.base_url}{path}"
+        self.payload_logger.debug("HTTP POST %s body=%s", url, payload(content))
+        with stage_timer("backend", *path_labels(path)):
+            resp = self._send("POST", url, data=content, headers={"Content-Type": content_type})
+        self.logger.info("HTTP POST %s (%d bytes) -> %s", url, len(content), resp.status_code)
+        resp.raise_for_status()
+        return resp.status_code, resp.headers.get("Content-Type", ""), resp.content
 
-    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
-        return self.request("GET", path, params=params)
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, ttl: float = 0) -> Any:
+        return self.request("GET", path, params=params, ttl=ttl)
 
     def post(self, path: str, json: Optional[Dict[str, Any]] = None) -> Any:
         return self.request("POST", path, json=json)
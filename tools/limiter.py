@@ -0,0 +1,192 @@
+"""Adaptive per-backend concurrency limits with a circuit breaker."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+import threading
+import time
+
+from config import settings
+
+# Backend answers that mean "overloaded" rather than "bad request".
+OVERLOAD_STATUSES = frozenset({429, 502, 503, 504})
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Weight of each new sample in the recent (~20 calls) and baseline
+# (~500 calls) latency averages.
+_SMOOTHING = 0.05
+_BASELINE_SMOOTHING = 0.002
+_MIN_DECREASE_INTERVAL = 0.1
+
+
+class BackendUnavailable(Exception):
+    """A backend call was shed by the limiter or an open circuit breaker."""
+
+    def __init__(self, base_url: str, reason: str, retry_after: float = 1.0) -> None:
+        super().__init__(f"Backend {base_url} unavailable: {reason}")
+        self.base_url = base_url
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit plus circuit breaker for one backend.
+
+    Calls beyond the current limit are rejected at once instead of queueing.
+    When the recent average latency exceeds ``tolerance`` times the long-term
+    average (the baseline), or on an overload failure, the limit is cut by
+    ``backoff``. Cuts happen at most once per recent round trip, and at least
+    100 ms apart. Comparing averages keeps a mix of cheap and expensive
+    calls, or a single slow one, from cutting the limit. Otherwise each call
+    raises the limit by ``1/limit``, about one per round trip, while the limit
+    is in use. After ``breaker_failures`` consecutive failures the breaker
+    opens for ``breaker_cooldown`` seconds. A single probe then
+    decides whether it closes again.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+        breaker_failures: int = 5,
+        breaker_cooldown: float = 30.0,
+    ) -> None:
+        self.base_url = base_url
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.state = CLOSED
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self.smoothed: Optional[float] = None
+        self.shed = 0
+        self.rejected = 0
+        self.failures = 0
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._last_decrease = 0.0
+        # Start token of the half-open trial call; calls that began before
+        # the breaker opened neither block nor decide the trial.
+        self._probe_start: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a slot or raise :class:`BackendUnavailable`; return a start token."""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN:
+                if now < self._open_until:
+                    self.rejected += 1
+                    raise BackendUnavailable(self.base_url, "circuit open", self._open_until - now)
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probe_start is not None:
+                    self.rejected += 1
+                    raise BackendUnavailable(self.base_url, "circuit half-open, probe in flight")
+                self._probe_start = now
+            elif self.in_flight >= int(self.limit):
+                self.shed += 1
+                raise BackendUnavailable(self.base_url, f"concurrency limit {int(self.limit)} reached")
+            self.in_flight += 1
+        return now
+
+    def release(self, start: float, failed: bool = False) -> None:
+        """Return the slot taken at ``start`` and learn from the outcome."""
+        now = time.monotonic()
+        latency = now - start
+        with self._lock:
+            utilized = self.in_flight >= self.limit / 2
+            self.in_flight -= 1
+            probe = self._end_probe(start)
+            if failed:
+                self.failures += 1
+                self._consecutive_failures += 1
+                self._decrease(now)
+                if probe or self._consecutive_failures >= self.breaker_failures:
+                    self.state = OPEN
+                    self._open_until = now + self.breaker_cooldown
+                    self._probe_start = None
+                return
+            self._consecutive_failures = 0
+            if probe:
+                self.state = CLOSED
+            if self.baseline is None or self.smoothed is None:
+                self.baseline = self.smoothed = latency
+            else:
+                self.baseline += (latency - self.baseline) * _BASELINE_SMOOTHING
+                self.smoothed += (latency - self.smoothed) * _SMOOTHING
+            if self.smoothed > self.baseline * self.tolerance:
+                self._decrease(now)
+            elif utilized:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def abandon(self, start: float) -> None:
+        """Return a slot without a latency sample, e.g. for a cancelled call."""
+        with self._lock:
+            self.in_flight -= 1
+            self._end_probe(start)
+
+    def _end_probe(self, start: float) -> bool:
+        """Whether the call started at ``start`` is the half-open probe; clear it."""
+        if self.state != HALF_OPEN or self._probe_start != start:
+            return False
+        self._probe_start = None
+        return True
+
+    def _decrease(self, now: float) -> None:
+        # Responses already in flight report the same slowdown; react once.
+        if now - self._last_decrease < max(_MIN_DECREASE_INTERVAL, self.smoothed or 0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "state": self.state,
+                "baseline_ms": round(self.baseline * 1000, 1) if self.baseline is not None else None,
+                "smoothed_ms": round(self.smoothed * 1000, 1) if self.smoothed is not None else None,
+                "shed": self.shed,
+                "rejected": self.rejected,
+                "failures": self.failures,
+            }
+
+
+_LIMITERS: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(base_url: str) -> Optional[AdaptiveLimiter]:
+    """Return the limiter shared by all invokers of ``base_url``, if enabled."""
+    if not settings.limiter:
+        return None
+    limiter = _LIMITERS.get(base_url)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _LIMITERS.get(base_url)
+            if limiter is None:
+                limiter = _LIMITERS[base_url] = AdaptiveLimiter(
+                    base_url,
+                    initial=settings.limiter_initial,
+                    min_limit=settings.limiter_min,
+                    max_limit=settings.limiter_max,
+                    tolerance=settings.limiter_latency_tolerance,
+                    breaker_failures=settings.breaker_failures,
+                    breaker_cooldown=settings.breaker_cooldown,
+                )
+    return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    return {url: limiter.stats() for url, limiter in list(_LIMITERS.items())}
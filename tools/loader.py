@@ -3,16 +3,28 @@
 from __future__ import annotations
 
 import os
-import sqlite3
-import sys
 import logging
-from typing import List, Tuple
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
 from config import settings
+from .sqlite_store import TABLE, ServiceIndex, SQLitePool
 
 logger = logging.getLogger(__name__)
-print(f"DEBUG: settings.dir = {settings.dir}", file=sys.stderr)
-logger.info("settings.dir = %s", settings.dir)
+
+_db_lock = threading.Lock()
+_db_pool: Optional[SQLitePool] = None
+_db_index: Optional[ServiceIndex] = None
+
+
+def _db() -> Tuple[SQLitePool, ServiceIndex]:
+    """Return the connection pool and service index for ``settings.db``."""
+    global _db_pool, _db_index
+    with _db_lock:
+        if _db_pool is None or _db_pool.path != settings.db:
+            _db_pool = SQLitePool(settings.db, settings.db_cached_statements)
+            _db_index = ServiceIndex(_db_pool, settings.db_index_ttl)
+        return _db_pool, _db_index
 
 
 def _load_from_file(service_name: str) -> Tuple[str, str]:
@@ -27,30 +39,45 @@ def _load_from_file(service_name: str) -> Tuple[str, str]:
 
 
 def _load_from_db(service_name: str) -> Tuple[str, str]:
-    conn = sqlite3.connect(settings.db)
-    conn.row_factory = sqlite3.Row
-    cur = conn.execute(
-        "SELECT base_url, metadata_raw FROM odata_services WHERE service_name = ?",
+    pool, _ = _db()
+    row = pool.fetchone(
+        f"SELECT base_url, metadata_raw FROM {TABLE} WHERE service_name = ?",
         (service_name,),
     )
-    row = cur.fetchone()
-    conn.close()
     if not row:
         raise FileNotFoundError(f"Service {service_name} not found")
     return row["metadata_raw"], row["base_url"]
 
 
 def load_metadata(service_name: str) -> Tuple[str, str]:
-    logger.info("load_metadata called; settings.dir=%s", settings.dir)
-    print(f"DEBUG: load_metadata using settings.dir={settings.dir}", file=sys.stderr)
+    logger.debug("load_metadata %s; dir=%s", service_name, settings.dir)
     if settings.dir:
         return _load_from_file(service_name)
     return _load_from_db(service_name)
 
 
+def service_signatures() -> Dict[str, Any]:
+    """Map each service to a value that changes when its metadata may have.
+
+    For a directory that is the XML file's mtime and size; for SQLite see
+    :meth:`ServiceIndex.signatures`.
+    """
+    if settings.dir:
+        if not os.path.isdir(settings.dir):
+            return {}
+        signatures: Dict[str, Any] = {}
+        with os.scandir(settings.dir) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(".xml"):
+                    st = entry.stat()
+                    signatures[os.path.splitext(entry.name)[0]] = (st.st_mtime_ns, st.st_size)
+        return signatures
+    _, index = _db()
+    return index.signatures()
+
+
 def list_services() -> List[str]:
-    logger.info("list_services called; settings.dir=%s", settings.dir)
-    print(f"DEBUG: list_services using settings.dir={settings.dir}", file=sys.stderr)
+    logger.debug("list_services; dir=%s", settings.dir)
     if settings.dir:
         if not os.path.isdir(settings.dir):
             return []
@@ -59,8 +86,5 @@ def list_services() -> List[str]:
             for f in os.listdir(settings.dir)
             if f.lower().endswith(".xml")
         )
-    conn = sqlite3.connect(settings.db)
-    cur = conn.execute("SELECT service_name FROM odata_services ORDER BY service_name")
-    rows = [r[0] for r in cur.fetchall()]
-    conn.close()
-    return rows
+    _, index = _db()
+    return index.names()
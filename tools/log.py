@@ -0,0 +1,138 @@
+"""Logging setup: a background queue listener and cheap payload arguments."""
+
+from __future__ import annotations
+
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Any, List, Optional, Union
+import atexit
+import logging
+import queue
+import random
+import reprlib
+import sys
+
+from config import settings
+
+_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+class Payload:
+    """Lazy ``%s`` argument that renders at most ``limit`` characters.
+
+    Nothing is formatted unless a record is actually emitted, and large
+    containers are rendered with :mod:`reprlib`, so the cost stays bounded
+    by ``limit`` rather than by the size of the value.
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: int) -> None:
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        value, limit = self.value, self.limit
+        if isinstance(value, (bytes, bytearray)):
+            text = bytes(value[: limit + 1]).decode("utf-8", errors="replace")
+            total = len(value)
+        elif isinstance(value, str):
+            text, total = value[: limit + 1], len(value)
+        else:
+            short = reprlib.Repr()
+            short.maxstring = short.maxother = limit
+            short.maxlist = short.maxdict = short.maxtuple = short.maxset = 50
+            text = short.repr(value)
+            total = None
+        if len(text) <= limit:
+            return text
+        suffix = f"... ({total} chars)" if total is not None else "..."
+        return text[:limit] + suffix
+
+
+def payload(value: Any) -> Union[Payload, Any]:
+    """Wrap a request or response body for logging; see :class:`Payload`."""
+    if settings.log_payload_chars <= 0:
+        return "<omitted>"
+    return Payload(value, settings.log_payload_chars)
+
+
+class SampleFilter(logging.Filter):
+    """Let through roughly ``rate`` of the records (1.0 keeps all)."""
+
+    def __init__(self, rate: float = 1.0) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+_sampler = SampleFilter()
+
+
+def payload_logger(name: str) -> logging.Logger:
+    """Return the ``<name>.payload`` logger; its records are sampled."""
+    logger = logging.getLogger(f"{name}.payload")
+    if _sampler not in logger.filters:
+        logger.addFilter(_sampler)
+    return logger
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Hand records to the listener thread without formatting them first.
+
+    The default ``prepare`` renders the message on the calling thread, which
+    is the cost this handler exists to avoid. Only :class:`Payload` arguments
+    are rendered here, which is bounded by their limit, so queued records do
+    not keep large request or response bodies alive. When the queue is full
+    the record is dropped instead of blocking the request.
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if isinstance(args, tuple):
+            if any(isinstance(a, Payload) for a in args):
+                record.args = tuple(str(a) if isinstance(a, Payload) else a for a in args)
+        elif isinstance(args, dict):
+            if any(isinstance(a, Payload) for a in args.values()):
+                record.args = {k: str(a) if isinstance(a, Payload) else a for k, a in args.items()}
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            type(self).dropped += 1
+
+
+def setup_logging(log_file: Optional[Union[str, Path]] = None) -> None:
+    """Route the root logger through a background queue listener.
+
+    Records go to stderr and, if given, ``log_file``; the level, payload
+    size and sampling rate come from the settings. Only the first call has
+    an effect.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    formatter = logging.Formatter(_FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, mode="a"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(settings.log_queue_size)
+    root = logging.getLogger()
+    root.setLevel(settings.log_level)
+    root.addHandler(_NonBlockingQueueHandler(records))
+    _sampler.rate = settings.log_sample_rate
+
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,97 @@
+"""On-disk cache of parsed metadata keyed by the XML content hash."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+from config import settings
+
+# Bump whenever the structure produced by ``parse_metadata`` changes so that
+# entries written by older code are ignored.
+FORMAT_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(xml: str) -> str:
+    """Return the SHA-256 hex digest of a metadata document."""
+    return hashlib.sha256(xml.encode("utf-8")).hexdigest()
+
+
+class MetadataCache:
+    """Store compiled service metadata as ``<service>.<hash>.json`` files.
+
+    A changed XML file or ``metadata_raw`` row has a different hash, so stale
+    entries are never read; they are removed when the new entry is written.
+    Cache I/O errors are logged and otherwise ignored.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def _name(self, service: str) -> str:
+        # The sanitized name alone is ambiguous ("A/B" and "A_B"); the hash
+        # of the raw name keeps services apart.
+        safe = re.sub(r"[^\w-]", "_", service)
+        return f"{safe}-{hashlib.sha256(service.encode('utf-8')).hexdigest()[:16]}"
+
+    def _prefix(self, service: str) -> str:
+        return os.path.join(self.directory, self._name(service))
+
+    def has(self, service: str, digest: str) -> bool:
+        return os.path.exists(f"{self._prefix(service)}.{digest}.json")
+
+    def load(self, service: str, digest: str) -> Optional[Dict[str, Any]]:
+        path = f"{self._prefix(service)}.{digest}.json"
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable metadata cache %s: %s", path, exc)
+            return None
+        if data.get("version") != FORMAT_VERSION:
+            return None
+        return data
+
+    def store(self, service: str, digest: str, data: Dict[str, Any]) -> None:
+        path = f"{self._prefix(service)}.{digest}.json"
+        tmp = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(dict(data, version=FORMAT_VERSION), fh, separators=(",", ":"))
+            os.replace(tmp, path)
+            tmp = None
+        except OSError as exc:
+            logger.warning("Could not write metadata cache %s: %s", path, exc)
+            return
+        finally:
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+        current = re.compile(rf"{re.escape(self._name(service))}\.[0-9a-f]{{64}}\.json")
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            old = os.path.join(self.directory, name)
+            if current.fullmatch(name) and old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+
+metadata_cache = MetadataCache(settings.metadata_cache_dir) if settings.metadata_cache_dir else None
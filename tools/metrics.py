@@ -0,0 +1,273 @@
+"""In-process metrics in the Prometheus text format.
+
+A small subset of ``prometheus_client``: counters, gauges and histograms
+with labels, plus collectors that turn existing ``stats()`` counters into
+metrics at scrape time. Updating a metric is a dict lookup and a short
+locked addition, so collection stays on in production.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+import math
+import threading
+import time
+
+from config import settings
+from . import timing
+
+PREFIX = "odata_bridge_"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Label values used once a metric has ``max_series`` children.
+OVERFLOW = "_other"
+
+LabelValues = Tuple[str, ...]
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Cumulative bucket counts (the last one is ``+Inf``) and the sum."""
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        running = 0
+        for i, count in enumerate(counts):
+            running += count
+            counts[i] = running
+        return counts, total
+
+
+class Metric:
+    """A metric family; :meth:`labels` returns the child for one label set.
+
+    Children beyond ``max_series`` share the :data:`OVERFLOW` label values,
+    so label values taken from requests cannot grow memory without bound.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_: str, labelnames: Sequence[str] = (), max_series: int = 2000) -> None:
+        self.name = name
+        self.help = help_
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._children: Dict[LabelValues, Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self) -> Any:
+        return _Value()
+
+    def labels(self, *values: str) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    if len(self._children) >= self.max_series:
+                        values = (OVERFLOW,) * len(self.labelnames)
+                        child = self._children.get(values)
+                    if child is None:
+                        child = self._children[values] = self._new_child()
+        return child
+
+    def children(self) -> List[Tuple[LabelValues, Any]]:
+        with self._lock:
+            return list(self._children.items())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        max_series: int = 2000,
+    ) -> None:
+        super().__init__(name, help_, labelnames, max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _Buckets:
+        return _Buckets(self.buckets)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _label_key(item: Tuple[LabelValues, Any]) -> LabelValues:
+    return item[0]
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], List[Metric]]] = []
+
+    def register(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect: Callable[[], List[Metric]]) -> None:
+        """Add a callable that builds extra metrics on every scrape."""
+        self._collectors.append(collect)
+
+    def collect(self) -> List[Metric]:
+        metrics = list(self._metrics)
+        for collect in self._collectors:
+            metrics.extend(collect())
+        return metrics
+
+    def render(self) -> str:
+        """The Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self.collect():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for values, child in sorted(metric.children(), key=_label_key):
+                if isinstance(child, _Buckets):
+                    counts, total = child.snapshot()
+                    names = metric.labelnames + ("le",)
+                    for bound, count in zip((*child.bounds, math.inf), counts):
+                        lines.append(
+                            f"{metric.name}_bucket{_labels_text(names, (*values, _number(bound)))} {count}"
+                        )
+                    labels = _labels_text(metric.labelnames, values)
+                    lines.append(f"{metric.name}_sum{labels} {_number(total)}")
+                    lines.append(f"{metric.name}_count{labels} {counts[-1]}")
+                else:
+                    labels = _labels_text(metric.labelnames, values)
+                    lines.append(f"{metric.name}{labels} {_number(child.value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The same metrics as a JSON-friendly dict, for JSON-RPC clients."""
+        out: Dict[str, Any] = {}
+        for metric in self.collect():
+            samples = []
+            for values, child in sorted(metric.children(), key=_label_key):
+                sample: Dict[str, Any] = {"labels": dict(zip(metric.labelnames, values))}
+                if isinstance(child, _Buckets):
+                    counts, total = child.snapshot()
+                    sample["count"] = counts[-1]
+                    sample["sum"] = total
+                    sample["buckets"] = {_number(b): c for b, c in zip((*child.bounds, math.inf), counts)}
+                else:
+                    sample["value"] = child.value
+                samples.append(sample)
+            out[metric.name] = {"type": metric.kind, "help": metric.help, "samples": samples}
+        return out
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    PREFIX + "stage_seconds",
+    "Time spent per stage, e.g. load_metadata, parse_metadata, build_models, backend, encode, request.",
+    ("stage", "service", "entity_set"),
+))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    PREFIX + "requests_in_flight", "Client requests being handled.", ("transport",)
+))
+HTTP_RESPONSES = REGISTRY.register(Counter(
+    PREFIX + "http_responses_total", "HTTP responses sent, by status code.", ("status",)
+))
+
+
+def observe_stage(stage: str, seconds: float, service: str = "", entity_set: str = "") -> None:
+    """Record a stage in the histogram and in the request's Server-Timing."""
+    if settings.metrics:
+        STAGE_SECONDS.labels(stage, service, entity_set).observe(seconds)
+    timing.record(stage, seconds)
+
+
+@contextmanager
+def stage_timer(stage: str, service: str = "", entity_set: str = "") -> Iterator[None]:
+    """Record the time spent in the ``with`` block under ``stage``.
+
+    Blocks that raise are not recorded; failures show up in the counters,
+    and names from failed lookups never become label values.
+    """
+    start = time.perf_counter()
+    yield
+    observe_stage(stage, time.perf_counter() - start, service, entity_set)
+
+
+def path_labels(path: str) -> Tuple[str, str]:
+    """``(service, entity_set)`` from a backend path like ``/Svc/Set(1)?...``."""
+    parts = path.split("?", 1)[0].split("/", 3)
+    service = parts[1] if len(parts) > 1 else ""
+    entity_set = parts[2].split("(", 1)[0] if len(parts) > 2 else ""
+    return service, entity_set
+
+
+def family(name: str, help_: str, labelname: str, values: Dict[str, float], kind: str = "gauge") -> Metric:
+    """A one-off metric for collectors, with one child per ``values`` item."""
+    metric = Counter(name, help_, (labelname,)) if kind == "counter" else Gauge(name, help_, (labelname,))
+    for label, value in values.items():
+        metric.labels(label).set(value)
+    return metric
+
+
+def hit_ratio(hits: float, misses: float) -> Optional[float]:
+    total = hits + misses
+    return hits / total if total else None
@@ -0,0 +1,288 @@
+"""Follow OData server-side paging and emit rows as NDJSON."""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Callable, Dict, Generator, List, Optional, Tuple
+from urllib.parse import urljoin
+import asyncio
+import logging
+
+from .serialize import dumpb
+
+if TYPE_CHECKING:
+    from .async_invoker import AsyncODataInvoker
+    from .invoker import ODataInvoker
+
+Pages = Generator[List[Any], None, None]
+AsyncPages = AsyncGenerator[List[Any], None]
+
+logger = logging.getLogger(__name__)
+
+
+def split_page(body: Any) -> Tuple[List[Any], Optional[str]]:
+    """Return the rows of a collection response and its next link.
+
+    Handles the V2 ``{"d": {"results": [...], "__next": ...}}`` envelope, the
+    V1 ``{"d": [...]}`` form and V4 ``value``/``@odata.nextLink``.
+    """
+    if not isinstance(body, dict):
+        return [], None
+    if "value" in body:
+        return body["value"], body.get("@odata.nextLink")
+    d = body.get("d", body)
+    if isinstance(d, list):
+        return d, None
+    if isinstance(d, dict) and "results" in d:
+        return d["results"], d.get("__next")
+    return [d], None
+
+
+def next_path(base_url: str, current: str, link: str) -> str:
+    """Turn a next link into a path below ``base_url``.
+
+    Relative links are resolved against the current request. Links that
+    leave the backend are rejected so that a response cannot make the bridge
+    call arbitrary hosts.
+    """
+    url = urljoin(f"{base_url}{current}", link)
+    if not url.startswith(base_url + "/"):
+        raise ValueError(f"Next link outside backend: {link}")
+    return url[len(base_url):]
+
+
+class NdjsonWriter:
+    """Encode rows as NDJSON lines while enforcing row and byte limits.
+
+    ``row_fn``, if given, transforms each row before it is encoded, e.g.
+    :func:`~tools.serialize.strip_metadata`.
+    """
+
+    def __init__(
+        self, max_rows: int = 0, max_bytes: int = 0, row_fn: Optional[Callable[[Any], Any]] = None
+    ) -> None:
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.row_fn = row_fn
+        self.rows = 0
+        self.bytes = 0
+        self.truncated = False
+        self.error: Optional[str] = None
+
+    def encode(self, rows: List[Any]) -> bytes:
+        out = []
+        row_fn = self.row_fn
+        for row in rows:
+            if row_fn is not None:
+                row = row_fn(row)
+            line = dumpb(row) + b"\n"
+            if (self.max_rows and self.rows >= self.max_rows) or (
+                self.max_bytes and self.bytes + len(line) > self.max_bytes
+            ):
+                self.truncated = True
+                break
+            out.append(line)
+            self.rows += 1
+            self.bytes += len(line)
+        return b"".join(out)
+
+    def trailer(self) -> bytes:
+        """Final line telling the client the output was cut short, if it was."""
+        if self.error is not None:
+            marker = {"@error": {"message": self.error, "rows": self.rows, "bytes": self.bytes}}
+        elif self.truncated:
+            marker = {"@truncated": {"rows": self.rows, "bytes": self.bytes}}
+        else:
+            return b""
+        return dumpb(marker) + b"\n"
+
+
+def iter_pages(invoker: "ODataInvoker", path: str, params: Optional[Dict[str, Any]] = None) -> Pages:
+    """Yield the rows of every page, fetching the next page in the background."""
+    pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        body = invoker.request("GET", path, params=params)
+        while True:
+            rows, link = split_page(body)
+            pending: Optional[Future] = None
+            if link:
+                path = next_path(invoker.base_url, path, link)
+                pending = pool.submit(invoker.request, "GET", path)
+            yield rows
+            if pending is None:
+                return
+            body = pending.result()
+    finally:
+        # Do not wait for a prefetch nobody will read.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def aiter_pages(invoker: "AsyncODataInvoker", path: str, params: Optional[Dict[str, Any]] = None) -> AsyncPages:
+    """Async :func:`iter_pages`; the prefetch is cancelled if iteration stops."""
+    body = await invoker.request("GET", path, params=params)
+    while True:
+        rows, link = split_page(body)
+        pending: Optional[asyncio.Future] = None
+        if link:
+            path = next_path(invoker.base_url, path, link)
+            pending = asyncio.ensure_future(invoker.request("GET", path))
+        try:
+            yield rows
+        except BaseException:
+            if pending is not None:
+                pending.cancel()
+            raise
+        if pending is None:
+            return
+        body = await pending
+
+
+def fanout_windows(total: int, params: Dict[str, Any], window: int) -> List[Dict[str, Any]]:
+    """Split the rows selected by ``params`` into ``$skip``/``$top`` windows."""
+    start = int(params.get("$skip") or 0)
+    end = total if params.get("$top") is None else min(total, start + int(params["$top"]))
+    base = {k: v for k, v in params.items() if k not in ("$skip", "$top", "$count")}
+    return [dict(base, **{"$skip": s, "$top": min(window, end - s)}) for s in range(start, end, window)]
+
+
+def _count_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {"$filter": params["$filter"]} if params.get("$filter") is not None else {}
+
+
+def count_rows(invoker: "ODataInvoker", path: str, params: Dict[str, Any]) -> int:
+    """``$count`` of the rows ``params`` filter, to size a fan-out."""
+    return int(invoker.request("GET", f"{path}/$count", params=_count_params(params)))
+
+
+async def acount_rows(invoker: "AsyncODataInvoker", path: str, params: Dict[str, Any]) -> int:
+    return int(await invoker.request("GET", f"{path}/$count", params=_count_params(params)))
+
+
+def iter_fanout(
+    invoker: "ODataInvoker", path: str, params: Dict[str, Any], total: int, parallelism: int, window: int
+) -> Pages:
+    """Read ``total`` rows of an entity set in parallel ``$skip``/``$top`` windows.
+
+    ``total`` comes from :func:`count_rows`. At most ``parallelism`` windows
+    are in flight, and they are yielded in window order, so rows keep the
+    ``$orderby`` order. Next links inside a window are followed in case the
+    backend pages it, up to the window's ``$top``.
+    """
+    windows = iter(fanout_windows(total, params, window))
+
+    def fetch(window_params: Dict[str, Any]) -> List[Any]:
+        rows: List[Any] = []
+        pages = iter_pages(invoker, path, window_params)
+        for page in pages:
+            rows.extend(page)
+            if len(rows) >= window_params["$top"]:
+                pages.close()
+                break
+        return rows[: window_params["$top"]]
+
+    pool = ThreadPoolExecutor(max_workers=parallelism)
+    try:
+        pending = deque(pool.submit(fetch, p) for p in islice(windows, parallelism))
+        while pending:
+            rows = pending.popleft().result()
+            following = next(windows, None)
+            if following is not None:
+                pending.append(pool.submit(fetch, following))
+            yield rows
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _drop_result(task: "asyncio.Future[Any]") -> None:
+    """Mark the error of an abandoned window as seen, so it is not logged."""
+    if not task.cancelled():
+        task.exception()
+
+
+async def aiter_fanout(
+    invoker: "AsyncODataInvoker", path: str, params: Dict[str, Any], total: int, parallelism: int, window: int
+) -> AsyncPages:
+    """Async :func:`iter_fanout`; windows still in flight are cancelled on close."""
+    windows = iter(fanout_windows(total, params, window))
+
+    async def fetch(window_params: Dict[str, Any]) -> List[Any]:
+        rows: List[Any] = []
+        pages = aiter_pages(invoker, path, window_params)
+        async for page in pages:
+            rows.extend(page)
+            if len(rows) >= window_params["$top"]:
+                await pages.aclose()
+                break
+        return rows[: window_params["$top"]]
+
+    pending = deque(asyncio.ensure_future(fetch(p)) for p in islice(windows, parallelism))
+    try:
+        while pending:
+            rows = await pending.popleft()
+            following = next(windows, None)
+            if following is not None:
+                pending.append(asyncio.ensure_future(fetch(following)))
+            yield rows
+    finally:
+        for task in pending:
+            task.cancel()
+            task.add_done_callback(_drop_result)
+
+
+def ndjson_pages(pages: Pages, writer: NdjsonWriter) -> Generator[bytes, None, None]:
+    """Encode pages of rows with ``writer``, stopping at its limits."""
+    try:
+        for rows in pages:
+            chunk = writer.encode(rows)
+            if chunk:
+                yield chunk
+            if writer.truncated:
+                break
+    finally:
+        pages.close()
+    yield writer.trailer()
+
+
+async def afirst_page(pages: AsyncPages) -> List[Any]:
+    """Fetch the first page before a response is started.
+
+    Errors then still reach the normal exception handlers and their status
+    codes, instead of ending a stream that has already answered 200. The
+    generator is closed if the fetch fails.
+    """
+    try:
+        return await pages.__anext__()
+    except StopAsyncIteration:
+        return []
+    except BaseException:
+        await pages.aclose()
+        raise
+
+
+async def andjson_pages(
+    pages: AsyncPages, writer: NdjsonWriter, first: Optional[List[Any]] = None
+) -> AsyncGenerator[bytes, None]:
+    """Async :func:`ndjson_pages` after a ``first`` page from :func:`afirst_page`.
+
+    The status line has been sent by the time a later page fails, so the
+    failure is logged and reported in an ``@error`` trailer line.
+    """
+    try:
+        chunk = writer.encode(first or [])
+        if chunk:
+            yield chunk
+        if not writer.truncated:
+            async for rows in pages:
+                chunk = writer.encode(rows)
+                if chunk:
+                    yield chunk
+                if writer.truncated:
+                    break
+    except Exception as exc:
+        logger.warning("Paged read failed after %d rows: %s", writer.rows, exc)
+        writer.error = str(exc) or type(exc).__name__
+    finally:
+        await pages.aclose()
+    yield writer.trailer()
@@ -2,56 +2,143 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
-import xmltodict
-
-
-def _ensure_list(val: Any) -> List[Any]:
-    if not val:
-        return []
-    if isinstance(val, list):
-        return val
-    return [val]
-
-
-def parse_metadata(xml: str) -> Dict[str, Any]:
-    doc = xmltodict.parse(xml)
-    edm = doc.get("edmx:Edmx", doc)
-    ds = edm.get("edmx:DataServices") or edm.get("DataServices")
-    schema = _ensure_list(ds.get("Schema"))[0]
-
-    res: Dict[str, Any] = {"entity_types": [], "entity_sets": [], "functions": [], "associations": [], "navigation": []}
-    res["namespace"] = schema.get("@Namespace")
-
-    for et in _ensure_list(schema.get("EntityType")):
-        keys = [k.get("@Name") for k in _ensure_list(et.get("Key", {}).get("PropertyRef"))]
-        props = []
-        for p in _ensure_list(et.get("Property")):
-            props.append({
-                "name": p.get("@Name"),
-                "type": p.get("@Type"),
-                "nullable": p.get("@Nullable", "true") != "false",
-                "label": p.get("sap:label"),
-            })
-        nav = []
-        for n in _ensure_list(et.get("NavigationProperty")):
-            nav.append({"name": n.get("@Name"), "relationship": n.get("@Relationship"), "to_role": n.get("@ToRole"), "from_role": n.get("@FromRole")})
-        res["entity_types"].append({"name": et.get("@Name"), "keys": keys, "properties": props, "navigation": nav})
-
-    container = schema.get("EntityContainer", {})
-    for es in _ensure_list(container.get("EntitySet")):
-        res["entity_sets"].append({"name": es.get("@Name"), "entity_type": es.get("@EntityType", "").split(".")[-1]})
-
-    for fi in _ensure_list(container.get("FunctionImport")):
-        params = []
-        for p in _ensure_list(fi.get("Parameter")):
-            params.append({"name": p.get("@Name"), "type": p.get("@Type")})
-        res["functions"].append({"name": fi.get("@Name"), "http_method": fi.get("@m:HttpMethod") or fi.get("@HttpMethod", "GET"), "parameters": params})
-
-    for assoc in _ensure_list(schema.get("Association")):
-        res["associations"].append({"name": assoc.get("@Name")})
-
-    for aset in _ensure_list(container.get("AssociationSet")):
-        res["navigation"].append({"name": aset.get("@Name")})
+from typing import IO, Any, Dict, List, Union
+import io
+import xml.etree.ElementTree as ET
+
+
+_SAP_LABEL = "{http://www.sap.com/Protocols/SAPData}label"
+_M_HTTP_METHOD = "{http://schemas.microsoft.com/ado/2007/08/dataservices/metadata}HttpMethod"
+
+# Namespaced tag -> local name; documents only use a few dozen distinct tags.
+_LOCAL_NAMES: Dict[str, str] = {}
+
+
+def _local(tag: str) -> str:
+    name = _LOCAL_NAMES.get(tag)
+    if name is None:
+        name = _LOCAL_NAMES[tag] = tag.rsplit("}", 1)[-1]
+    return name
+
+
+def _properties(elem: ET.Element) -> List[Dict[str, Any]]:
+    props = []
+    for p in elem:
+        if _local(p.tag) != "Property":
+            continue
+        props.append({
+            "name": p.get("Name"),
+            "type": p.get("Type"),
+            "nullable": p.get("Nullable", "true") != "false",
+            "label": p.get(_SAP_LABEL),
+        })
+    return props
+
+
+def _entity_type(elem: ET.Element) -> Dict[str, Any]:
+    keys: List[str] = []
+    nav = []
+    for child in elem:
+        tag = _local(child.tag)
+        if tag == "Key":
+            keys.extend(ref.get("Name") for ref in child if _local(ref.tag) == "PropertyRef")
+        elif tag == "NavigationProperty":
+            nav.append({"name": child.get("Name"), "relationship": child.get("Relationship"), "to_role": child.get("ToRole"), "from_role": child.get("FromRole")})
+    return {"name": elem.get("Name"), "keys": keys, "properties": _properties(elem), "navigation": nav}
+
+
+def _function(elem: ET.Element) -> Dict[str, Any]:
+    params = [
+        {"name": p.get("Name"), "type": p.get("Type")}
+        for p in elem
+        if _local(p.tag) == "Parameter"
+    ]
+    return {"name": elem.get("Name"), "http_method": elem.get(_M_HTTP_METHOD) or elem.get("HttpMethod", "GET"), "parameters": params}
+
+
+def parse_metadata(xml: Union[str, bytes, IO[bytes]]) -> Dict[str, Any]:
+    """Parse an EDMX document incrementally.
+
+    Each entity type, entity set, function import, ... is converted as soon as
+    its closing tag is read and then dropped from the tree, so memory use
+    beyond the result does not grow with the document size. All ``Schema``
+    elements are merged; ``namespace`` is the first schema's namespace.
+    """
+    if isinstance(xml, str):
+        xml = xml.encode("utf-8")
+    source = io.BytesIO(xml) if isinstance(xml, bytes) else xml
+
+    res: Dict[str, Any] = {"entity_types": [], "complex_types": [], "entity_sets": [], "functions": [], "associations": [], "navigation": []}
+    res["namespace"] = None
+    res["namespaces"] = []
+
+    stack: List[ET.Element] = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            if _local(elem.tag) == "Schema":
+                namespace = elem.get("Namespace")
+                res["namespaces"].append(namespace)
+                if res["namespace"] is None:
+                    res["namespace"] = namespace
+            continue
+
+        stack.pop()
+        if not stack:
+            break
+        tag = _local(elem.tag)
+        parent_tag = _local(stack[-1].tag)
+        if parent_tag == "Schema":
+            if tag == "EntityType":
+                res["entity_types"].append(_entity_type(elem))
+            elif tag == "ComplexType":
+                res["complex_types"].append({"name": elem.get("Name"), "properties": _properties(elem)})
+            elif tag == "Association":
+                res["associations"].append({"name": elem.get("Name")})
+        elif parent_tag == "EntityContainer":
+            if tag == "EntitySet":
+                res["entity_sets"].append({"name": elem.get("Name"), "entity_type": elem.get("EntityType", "").split(".")[-1]})
+            elif tag == "FunctionImport":
+                res["functions"].append(_function(elem))
+            elif tag == "AssociationSet":
+                res["navigation"].append({"name": elem.get("Name")})
+        else:
+            continue
+        # Drop every direct child of Schema/EntityContainer once read, including
+        # annotations and documentation. It is always the parent's last child.
+        del stack[-1][-1]
 
     return res
+
+
+def summarize_metadata(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """Condense a :func:`parse_metadata` result for prompts and quick lookups.
+
+    Entity sets carry their keys, ``{property: type}`` and navigation names;
+    labels, nullability and associations are left out.
+    """
+    types = {et["name"]: et for et in parsed.get("entity_types", [])}
+    entity_sets = {}
+    for es in parsed.get("entity_sets", []):
+        et = types.get(es["entity_type"], {})
+        entity_sets[es["name"]] = {
+            "type": es["entity_type"],
+            "keys": et.get("keys", []),
+            "properties": {p["name"]: p["type"] for p in et.get("properties", [])},
+            "navigation": [n["name"] for n in et.get("navigation", [])],
+        }
+    return {
+        "namespace": parsed.get("namespace"),
+        "entity_sets": entity_sets,
+        "complex_types": {
+            ct["name"]: {p["name"]: p["type"] for p in ct.get("properties", [])}
+            for ct in parsed.get("complex_types", [])
+        },
+        "functions": {
+            fn["name"]: {
+                "method": fn["http_method"],
+                "parameters": {p["name"]: p["type"] for p in fn["parameters"]},
+            }
+            for fn in parsed.get("functions", [])
+        },
+    }
@@ -0,0 +1,92 @@
+"""Static response bodies with precomputed compressed variants."""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Optional
+import gzip
+import threading
+
+try:  # optional brotli support
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+IDENTITY = "identity"
+
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    found: Dict[str, Callable[[bytes], bytes]] = {"gzip": lambda data: gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        found["br"] = brotli.compress
+    return found
+
+
+_COMPRESSORS = _compressors()
+# Preferred first when the client accepts several.
+_PREFERENCE = ["br", "gzip"]
+
+
+def negotiate(accept_encoding: str) -> str:
+    """Pick the best supported coding from an ``Accept-Encoding`` header."""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    for coding in _PREFERENCE:
+        if coding in _COMPRESSORS and accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return IDENTITY
+
+
+class Precompressed:
+    """A body with a strong ETag and lazily built, memoized compressed forms.
+
+    Each content coding has its own ETag (``"<tag>-gzip"``) as strong
+    validators must differ between representations; ``If-None-Match``
+    accepts any of them, which is the weak comparison HTTP asks for there.
+    """
+
+    def __init__(self, body: bytes, media_type: str, tag: str) -> None:
+        self.media_type = media_type
+        self.tag = tag
+        self._bodies: Dict[str, bytes] = {IDENTITY: body}
+        self._lock = threading.Lock()
+
+    def etag(self, coding: str = IDENTITY) -> str:
+        return f'"{self.tag}"' if coding == IDENTITY else f'"{self.tag}-{coding}"'
+
+    def cached(self, coding: str) -> Optional[bytes]:
+        """The body for ``coding`` if it was already built."""
+        return self._bodies.get(coding)
+
+    def body(self, coding: str = IDENTITY) -> bytes:
+        """The body for ``coding``, compressing it on first use."""
+        body = self._bodies.get(coding)
+        if body is None:
+            with self._lock:
+                body = self._bodies.get(coding)
+                if body is None:
+                    body = self._bodies[coding] = _COMPRESSORS[coding](self._bodies[IDENTITY])
+        return body
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an ``If-None-Match`` header names this body."""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        valid = {self.etag(c) for c in [IDENTITY, *_COMPRESSORS]}
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag in valid:
+                return True
+        return False
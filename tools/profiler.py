@@ -0,0 +1,65 @@
+"""Sampling profiler over all threads of the running process."""
+
+from __future__ import annotations
+
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional
+import os
+import sys
+import threading
+import time
+
+# One profile at a time; concurrent runs would sample each other.
+_running = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    # The function's first line, so samples of one function merge.
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Dict[str, int]:
+    """Sample every thread's stack each ``interval`` seconds.
+
+    Returns ``{"thread;outer;...;inner": samples}``. The sampling thread
+    itself is left out. Reading ``sys._current_frames`` takes the GIL for a
+    moment per sample and nothing runs between samples, so the overhead is
+    small at the default 200 Hz.
+    """
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        me = threading.get_ident()
+        counts: Counter[str] = Counter()
+        names: Dict[int, str] = {}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frames = sys._current_frames()
+            if frames.keys() - names.keys():
+                names = {t.ident: t.name for t in threading.enumerate() if t.ident is not None}
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                stack: List[str] = []
+                current: Optional[FrameType] = frame
+                while current is not None:
+                    stack.append(_frame_name(current))
+                    current = current.f_back
+                stack.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+                counts[";".join(reversed(stack))] += 1
+            del frames
+            time.sleep(interval)
+        return dict(counts)
+    finally:
+        _running.release()
+
+
+def collapsed(stacks: Dict[str, int]) -> str:
+    """Render in the collapsed format read by flamegraph.pl and speedscope."""
+    return "".join(f"{stack} {n}\n" for stack, n in sorted(stacks.items()))
@@ -0,0 +1,184 @@
+"""Thread-safe, bounded registry of built service contexts."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+import threading
+import time
+
+T = TypeVar("T")
+
+
+class ContextRegistry(Generic[T]):
+    """LRU registry that builds each entry at most once at a time.
+
+    Concurrent callers asking for the same missing name wait on a per-name
+    build lock instead of building it themselves. Entries are evicted least
+    recently used first once the sum of ``sizeof`` exceeds ``max_bytes``.
+    Names whose factory raised ``FileNotFoundError`` are remembered for
+    ``negative_ttl`` seconds so unknown services do not trigger new loads;
+    at most ``max_negative`` of them are kept, oldest dropped first.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], T],
+        sizeof: Callable[[T], int],
+        max_bytes: int,
+        negative_ttl: float = 0,
+        max_negative: int = 10000,
+    ) -> None:
+        self.factory = factory
+        self.sizeof = sizeof
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self.max_negative = max_negative
+        self._entries: "OrderedDict[str, Tuple[T, int]]" = OrderedDict()
+        self._negative: "OrderedDict[str, Tuple[float, FileNotFoundError]]" = OrderedDict()
+        self._building: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.builds = 0
+        self.evictions = 0
+
+    def get(self, name: str) -> Optional[T]:
+        """Return the entry for ``name`` if it is already built."""
+        with self._lock:
+            item = self._entries.get(name)
+            if item is None:
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+            return item[0]
+
+    def peek(self, name: str) -> Optional[T]:
+        """Like :meth:`get`, without counting a hit or touching the LRU order."""
+        with self._lock:
+            item = self._entries.get(name)
+            return item[0] if item is not None else None
+
+    def touch(self, name: str) -> bool:
+        """Mark ``name`` as most recently used without counting a hit."""
+        with self._lock:
+            if name not in self._entries:
+                return False
+            self._entries.move_to_end(name)
+            return True
+
+    def get_or_build(self, name: str, factory: Optional[Callable[[str], T]] = None) -> T:
+        """Return the entry for ``name``, building it with ``factory`` if needed."""
+        with self._lock:
+            item = self._entries.get(name)
+            if item is not None:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return item[0]
+            self._raise_negative(name)
+            self.misses += 1
+            build_lock = self._building.setdefault(name, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                item = self._entries.get(name)
+                if item is not None:
+                    return item[0]
+                # The build this caller waited for may have failed.
+                self._raise_negative(name)
+            try:
+                value = (factory or self.factory)(name)
+            except FileNotFoundError as exc:
+                with self._lock:
+                    self._remember_negative(name, exc)
+                    self._building.pop(name, None)
+                raise
+            except BaseException:
+                with self._lock:
+                    self._building.pop(name, None)
+                raise
+            with self._lock:
+                self.builds += 1
+                self._building.pop(name, None)
+                self._store(name, value)
+            return value
+
+    def _raise_negative(self, name: str) -> None:
+        """Re-raise the remembered ``FileNotFoundError`` for ``name``; lock held."""
+        negative = self._negative.get(name)
+        if negative is None:
+            return
+        if negative[0] > time.monotonic():
+            self.negative_hits += 1
+            raise negative[1]
+        del self._negative[name]
+
+    def _remember_negative(self, name: str, exc: FileNotFoundError) -> None:
+        """Remember that ``name`` does not exist; lock held."""
+        if self.negative_ttl <= 0 or self.max_negative <= 0:
+            return
+        now = time.monotonic()
+        self._negative.pop(name, None)
+        self._negative[name] = (now + self.negative_ttl, exc)
+        # All entries share one TTL, so insertion order is expiry order.
+        while self._negative:
+            oldest = next(iter(self._negative.values()))
+            if oldest[0] > now and len(self._negative) <= self.max_negative:
+                break
+            self._negative.popitem(last=False)
+
+    def put(self, name: str, value: T) -> None:
+        """Insert or atomically replace the entry for ``name``."""
+        with self._lock:
+            self._negative.pop(name, None)
+            self._store(name, value)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Forget ``name`` (including a negative entry), or everything."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                self._negative.clear()
+                self._bytes = 0
+                return
+            self._negative.pop(name, None)
+            item = self._entries.pop(name, None)
+            if item is not None:
+                self._bytes -= item[1]
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def __contains__(self, name: object) -> bool:
+        with self._lock:
+            return name in self._entries
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "negative_entries": len(self._negative),
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+                "builds": self.builds,
+                "evictions": self.evictions,
+            }
+
+    def _store(self, name: str, value: T) -> None:
+        old = self._entries.pop(name, None)
+        if old is not None:
+            self._bytes -= old[1]
+        size = self.sizeof(value)
+        self._entries[name] = (value, size)
+        self._bytes += size
+        # Always keep the newest entry, even if it alone exceeds the cap.
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self.evictions += 1
@@ -0,0 +1,135 @@
+"""Timeouts, bounded retries and request hedging for backend calls."""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import math
+import random
+import threading
+
+from config import settings
+
+# Methods that may be sent again after a failure (RFC 9110 idempotent ones).
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Methods that may run twice at the same time; only safe ones.
+HEDGED_METHODS = frozenset({"GET", "HEAD"})
+# Backend answers worth one more try.
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# Latency samples kept per backend, and how often the p95 is recomputed.
+_WINDOW = 512
+_RECOMPUTE_EVERY = 32
+
+
+def _seconds(value: float) -> Optional[float]:
+    return value if value > 0 else None
+
+
+def timeouts() -> Tuple[Optional[float], Optional[float]]:
+    """``(connect, read)`` timeouts in seconds; ``None`` waits forever."""
+    return _seconds(settings.connect_timeout), _seconds(settings.read_timeout)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number ``attempt`` (1-based)."""
+    cap = min(settings.retry_backoff_max, settings.retry_backoff * 2 ** (attempt - 1))
+    return random.uniform(0, cap)
+
+
+class BackendStats:
+    """Latency window, status codes and retry/hedging counters for one backend.
+
+    The p95 over the last few hundred successful attempts is the hedging
+    delay; it is recomputed every few samples rather than per request.
+    """
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url
+        self.attempts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.statuses: Dict[int, int] = {}
+        self._latencies: Deque[float] = deque(maxlen=_WINDOW)
+        self._p95: Optional[float] = None
+        self._since_recompute = 0
+        self._lock = threading.Lock()
+
+    def started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def abandoned(self) -> None:
+        """An attempt was cancelled before it got a response."""
+        with self._lock:
+            self.in_flight -= 1
+
+    def record(self, status: int, latency: Optional[float] = None) -> None:
+        """An attempt got a response; ``latency`` feeds the p95 if given."""
+        with self._lock:
+            self.in_flight -= 1
+            self.attempts += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if latency is None:
+                return
+            self._latencies.append(latency)
+            self._since_recompute += 1
+            if self._p95 is None or self._since_recompute >= _RECOMPUTE_EVERY:
+                ordered = sorted(self._latencies)
+                self._p95 = ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)]
+                self._since_recompute = 0
+
+    def failed(self, timeout: bool = False) -> None:
+        """An attempt got no response."""
+        with self._lock:
+            self.in_flight -= 1
+            self.attempts += 1
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.errors += 1
+
+    def count(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or ``None`` if hedging is off."""
+        if not settings.hedge or len(self._latencies) < settings.hedge_min_samples:
+            return None
+        return max(settings.hedge_min_delay, self._p95 or 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "statuses": {str(code): n for code, n in sorted(self.statuses.items())},
+                "p95_ms": round(self._p95 * 1000, 1) if self._p95 is not None else None,
+            }
+
+
+_BACKENDS: Dict[str, BackendStats] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend_stats(base_url: str) -> BackendStats:
+    """Return the counters shared by all invokers of ``base_url``."""
+    stats = _BACKENDS.get(base_url)
+    if stats is None:
+        with _backends_lock:
+            stats = _BACKENDS.setdefault(base_url, BackendStats(base_url))
+    return stats
+
+
+def backend_stats() -> Dict[str, Dict[str, Any]]:
+    return {url: stats.stats() for url, stats in list(_BACKENDS.items())}
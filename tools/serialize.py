@@ -0,0 +1,81 @@
+"""Compact JSON encoding of tool results."""
+
+from __future__ import annotations
+
+from typing import Any
+import json
+
+from config import settings
+
+try:  # optional accelerated encoder
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# OData V2 bookkeeping: per-entity ``__metadata`` and unexpanded navigation
+# properties, which are ``{"__deferred": {"uri": ...}}``.
+_METADATA = "__metadata"
+_DEFERRED = "__deferred"
+
+
+def strip_metadata(value: Any) -> Any:
+    """Return ``value`` without ``__metadata`` keys and deferred links.
+
+    Works on the ``{"d": {"results": [...]}}`` envelope as well as on
+    single entities and expanded navigation properties. The input is not
+    modified, since it may be shared with the response cache.
+    """
+    if isinstance(value, list):
+        return [strip_metadata(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    out = {}
+    for k, v in value.items():
+        if k == _METADATA:
+            continue
+        # Only containers are visited; rows are mostly scalars.
+        if isinstance(v, dict):
+            if _DEFERRED in v:
+                continue
+            v = strip_metadata(v)
+        elif isinstance(v, list):
+            v = strip_metadata(v)
+        out[k] = v
+    return out
+
+
+def _json_default(value: Any) -> Any:
+    return str(value)
+
+
+def dumpb(value: Any) -> bytes:
+    """Encode ``value`` as compact UTF-8 JSON, with orjson if installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=_json_default)
+        except TypeError:
+            # e.g. integers beyond 64 bits; fall through to the stdlib encoder
+            pass
+    return json.dumps(
+        value, separators=(",", ":"), ensure_ascii=False, default=_json_default
+    ).encode("utf-8")
+
+
+def dumps(value: Any) -> str:
+    """Encode ``value`` as compact JSON text, with orjson if installed."""
+    return dumpb(value).decode("utf-8")
+
+
+def dumps_result(value: Any) -> str:
+    """Render a tool result as text for ``tools/call``.
+
+    Strings, such as NDJSON from paged reads, are returned unchanged; paged
+    reads strip their rows while encoding them. Other values are stripped of
+    OData metadata (``strip_metadata`` setting) and encoded with
+    :func:`dumps`.
+    """
+    if isinstance(value, str):
+        return value
+    if settings.strip_metadata:
+        value = strip_metadata(value)
+    return dumps(value)
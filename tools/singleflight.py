@@ -0,0 +1,125 @@
+"""Coalesce identical concurrent backend requests into a single call."""
+
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import threading
+
+from config import settings
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _Group:
+    def __init__(self, timeout: Optional[float]) -> None:
+        self.timeout = timeout
+        self._calls: Dict[Hashable, Any] = {}
+        self.leaders = 0
+        self.collapsed = 0
+        self.timeouts = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+            "timeouts": self.timeouts,
+            "in_flight": len(self._calls),
+        }
+
+
+class SingleFlight(_Group):
+    """Thread based single-flight group.
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight wait up to ``timeout`` seconds and receive the same result or
+    exception.
+    """
+
+    def __init__(self, timeout: Optional[float] = None) -> None:
+        super().__init__(timeout)
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.collapsed += 1
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as exc:
+                call.error = exc
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.event.set()
+            return call.result
+        if not call.event.wait(self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError("Timed out waiting for coalesced backend request")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class AsyncSingleFlight(_Group):
+    """Asyncio single-flight group.
+
+    The shared backend call runs as its own task, so a cancelled caller does
+    not cancel it for the others; it is only cancelled once every waiter has
+    gone away. As in :class:`SingleFlight`, only followers are bound by
+    ``timeout``; the leader waits for the call, which has its own deadline.
+    """
+
+    def __init__(self, timeout: Optional[float] = None) -> None:
+        super().__init__(timeout)
+        self._waiters: Dict[Hashable, int] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        leader = task is None
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+            self.leaders += 1
+        else:
+            self.collapsed += 1
+        self._waiters[key] += 1
+        try:
+            if leader:
+                return await asyncio.shield(task)
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            if self._calls.get(key) is task:
+                self._waiters[key] -= 1
+                if not self._waiters[key] and not task.done():
+                    task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved; waiters re-raise it themselves
+
+
+flights = SingleFlight(settings.coalesce_timeout)
+async_flights = AsyncSingleFlight(settings.coalesce_timeout)
@@ -0,0 +1,147 @@
+"""Read-only access to the SQLite metadata store."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import sqlite3
+import threading
+import time
+
+TABLE = "odata_services"
+
+FileId = Tuple[int, int]
+
+
+def _file_id(path: str) -> Optional[FileId]:
+    """Identity of the database file, to notice when it is replaced."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+class SQLitePool:
+    """Thread-local, read-only connections to one database file.
+
+    Each thread keeps its connection (and its statement cache) for as long
+    as the file is not replaced, instead of connecting per query. The
+    connections are opened with ``mode=ro`` and never write, so they don't
+    block writers and read consistent snapshots of a WAL database.
+    """
+
+    def __init__(self, path: str, cached_statements: int = 64, timeout: float = 5.0) -> None:
+        self.path = path
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        """Open a new read-only connection."""
+        uri = Path(os.path.abspath(self.path)).as_uri() + "?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            timeout=self.timeout,
+            cached_statements=self.cached_statements,
+            check_same_thread=check_same_thread,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it if the file changed."""
+        file_id = _file_id(self.path)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.file_id == file_id:
+            return conn
+        if conn is not None:
+            conn.close()
+        self._local.conn = conn = self.connect()
+        self._local.file_id = file_id
+        return conn
+
+    def fetchone(self, sql: str, params: Tuple[Any, ...] = ()) -> Optional[sqlite3.Row]:
+        return self.connection().execute(sql, params).fetchone()
+
+
+class ServiceIndex:
+    """In-memory list of service names from the ``odata_services`` table.
+
+    The list is reused for ``ttl`` seconds without touching the database.
+    After that, a cheap version check decides whether to re-read it: the
+    row count and ``max(updated_at)`` when the table has that column,
+    otherwise SQLite's ``PRAGMA data_version``.
+    """
+
+    def __init__(self, pool: SQLitePool, ttl: float = 5.0) -> None:
+        self.pool = pool
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._file_id: Optional[FileId] = None
+        self._has_updated_at = False
+        self._version: Any = None
+        self._names: Optional[List[str]] = None
+        self._signatures: Dict[str, Any] = {}
+        self._checked = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        # A private connection: data_version is only comparable on the
+        # connection that produced it.
+        file_id = _file_id(self.pool.path)
+        if self._conn is None or file_id != self._file_id:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = self.pool.connect(check_same_thread=False)
+            self._file_id = file_id
+            self._version = None
+            columns = {r["name"] for r in self._conn.execute(f"PRAGMA table_info({TABLE})")}
+            self._has_updated_at = "updated_at" in columns
+        return self._conn
+
+    def _read_version(self, conn: sqlite3.Connection) -> Any:
+        if self._has_updated_at:
+            return tuple(conn.execute(f"SELECT count(*), max(updated_at) FROM {TABLE}").fetchone())
+        # data_version restarts on a new connection; the file id tells a
+        # replaced database apart.
+        return self._file_id, conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh(self, force: bool = False) -> bool:
+        """Re-read the names if the table changed; return whether it did."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._names is not None and now - self._checked < self.ttl:
+                return False
+            conn = self._connection()
+            version = self._read_version(conn)
+            self._checked = now
+            if not force and self._names is not None and version == self._version:
+                return False
+            if self._has_updated_at:
+                sql = f"SELECT service_name, updated_at FROM {TABLE} ORDER BY service_name"
+                signatures = {r[0]: r[1] for r in conn.execute(sql)}
+            else:
+                sql = f"SELECT service_name FROM {TABLE} ORDER BY service_name"
+                signatures = {r[0]: version for r in conn.execute(sql)}
+            names = list(signatures)
+            changed = names != self._names
+            self._names, self._signatures, self._version = names, signatures, version
+            return changed
+
+    def names(self) -> List[str]:
+        self.refresh()
+        return list(self._names or [])
+
+    def signatures(self) -> Dict[str, Any]:
+        """Map each service to a value that changes when its row may have.
+
+        That is ``updated_at`` if the table has it; otherwise every service
+        gets the store version, so any write marks all of them.
+        """
+        self.refresh()
+        return dict(self._signatures)
@@ -0,0 +1,69 @@
+"""Per-request stage timings for ``Server-Timing`` headers and ``_meta``."""
+
+from __future__ import annotations
+
+from contextvars import ContextVar, Token
+from typing import Dict, List, Optional
+import threading
+
+_current: ContextVar[Optional["RequestTiming"]] = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    """Durations per stage for one request, summed over repeated stages.
+
+    Copies of the request's context (threadpool calls, tasks) share the
+    same instance, so stages recorded there are collected too.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                self._entries[name] = [seconds, 1]
+            else:
+                entry[0] += seconds
+                entry[1] += 1
+
+    def as_dict(self) -> Dict[str, float]:
+        """Milliseconds per stage."""
+        with self._lock:
+            return {name: round(entry[0] * 1000, 3) for name, entry in self._entries.items()}
+
+    def header(self, total: Optional[float] = None) -> str:
+        """A ``Server-Timing`` value; repeated stages note their count."""
+        with self._lock:
+            entries = list(self._entries.items())
+        parts = []
+        for name, (seconds, count) in entries:
+            part = f"{name};dur={seconds * 1000:.3f}"
+            if count > 1:
+                part += f';desc="{int(count)} calls"'
+            parts.append(part)
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(parts)
+
+
+def start() -> Token:
+    """Begin collecting for the current request; pass the token to :func:`stop`."""
+    return _current.set(RequestTiming())
+
+
+def stop(token: Token) -> None:
+    _current.reset(token)
+
+
+def current() -> Optional[RequestTiming]:
+    return _current.get()
+
+
+def record(name: str, seconds: float) -> None:
+    """Add to the current request's timings, if they are being collected."""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name, seconds)
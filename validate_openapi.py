@@ -1,6 +1,6 @@
 from fastapi.testclient import TestClient
 from openapi_spec_validator import validate_spec
-from app.main import app
+from openapi_server import app
 
 client = TestClient(app)
 resp = client.get("/openapi.json")